@@ -0,0 +1,35 @@
+"""Add FULLTEXT search indexes for authors and books
+
+Revision ID: 3c7e1a9f4b21
+Revises: e1fd1ce55e45
+Create Date: 2026-10-15 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7e1a9f4b21'
+down_revision: Union[str, Sequence[str], None] = 'e1fd1ce55e45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ft_author_search', 'authors',
+        ['full_name', 'first_name', 'last_name', 'bio', 'nationality', 'genres'],
+        unique=False, mysql_prefix='FULLTEXT'
+    )
+    op.create_index('ft_author_full_name', 'authors', ['full_name'], unique=False, mysql_prefix='FULLTEXT')
+    op.create_index('ft_book_search', 'books', ['title', 'description'], unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ft_book_search', table_name='books')
+    op.drop_index('ft_author_full_name', table_name='authors')
+    op.drop_index('ft_author_search', table_name='authors')
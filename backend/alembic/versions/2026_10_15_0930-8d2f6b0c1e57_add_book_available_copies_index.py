@@ -0,0 +1,27 @@
+"""Add index for available-only book listings
+
+Revision ID: 8d2f6b0c1e57
+Revises: 3c7e1a9f4b21
+Create Date: 2026-10-15 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2f6b0c1e57'
+down_revision: Union[str, Sequence[str], None] = '3c7e1a9f4b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_book_available_copies', 'books', ['available_copies'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_book_available_copies', table_name='books')
@@ -0,0 +1,71 @@
+"""Store author social media links as JSON
+
+Revision ID: 5a9c3e7d2f14
+Revises: 8d2f6b0c1e57
+Create Date: 2026-10-15 10:00:00.000000
+
+"""
+import json
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9c3e7d2f14'
+down_revision: Union[str, Sequence[str], None] = '8d2f6b0c1e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Key under which values that are not a platform -> URL mapping are kept verbatim
+LEGACY_KEY = "legacy"
+
+
+def _legacy_wrapped(raw: str) -> Optional[str]:
+    """JSON wrapping ``raw`` under the legacy key, or None if it already is a str -> str mapping."""
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        value = None
+    if isinstance(value, dict) and all(isinstance(v, str) for v in value.values()):
+        return None
+    return json.dumps({LEGACY_KEY: raw})
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # MySQL rejects the type change if any value is not valid JSON, and the API reads the
+    # column as a platform -> URL mapping; anything else is preserved under the legacy key
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, social_media FROM authors WHERE social_media IS NOT NULL")).fetchall()
+    for author_id, raw in rows:
+        converted = _legacy_wrapped(raw)
+        if converted is not None:
+            conn.execute(
+                sa.text("UPDATE authors SET social_media = :value WHERE id = :id"),
+                {"value": converted, "id": author_id},
+            )
+    op.alter_column('authors', 'social_media',
+               existing_type=sa.Text(),
+               type_=sa.JSON(),
+               existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('authors', 'social_media',
+               existing_type=sa.JSON(),
+               type_=sa.Text(),
+               existing_nullable=True)
+    # Restore wrapped values to their original text
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, social_media FROM authors WHERE social_media IS NOT NULL")).fetchall()
+    for author_id, value in rows:
+        value = json.loads(value)
+        if isinstance(value, dict) and list(value) == [LEGACY_KEY]:
+            conn.execute(
+                sa.text("UPDATE authors SET social_media = :value WHERE id = :id"),
+                {"value": value[LEGACY_KEY], "id": author_id},
+            )
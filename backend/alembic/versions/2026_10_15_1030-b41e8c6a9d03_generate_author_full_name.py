@@ -0,0 +1,51 @@
+"""Generate author full_name in the database and make it unique
+
+Revision ID: b41e8c6a9d03
+Revises: 5a9c3e7d2f14
+Create Date: 2026-10-15 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e8c6a9d03'
+down_revision: Union[str, Sequence[str], None] = '5a9c3e7d2f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The unique index below would fail halfway through on duplicate names; report them up front
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT CONCAT(first_name, ' ', last_name) AS name, COUNT(*) FROM authors "
+        "GROUP BY name HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        names = ", ".join(f"'{name}' ({count})" for name, count in duplicates)
+        raise RuntimeError(
+            f"Cannot make author full_name unique; merge or rename the duplicate authors first: {names}"
+        )
+
+    # MySQL allows converting a regular column to a STORED generated one in place;
+    # existing indexes on full_name are kept.
+    op.execute(
+        "ALTER TABLE authors MODIFY COLUMN full_name VARCHAR(200) "
+        "GENERATED ALWAYS AS (CONCAT(first_name, ' ', last_name)) STORED NOT NULL"
+    )
+    # Tables created by create_all have ix_authors_full_name; older ones may not
+    existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('authors')}
+    if 'ix_authors_full_name' in existing:
+        op.drop_index('ix_authors_full_name', table_name='authors')
+    op.create_index('ix_authors_full_name', 'authors', ['full_name'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_authors_full_name', table_name='authors')
+    op.create_index('ix_authors_full_name', 'authors', ['full_name'], unique=False)
+    op.execute("ALTER TABLE authors MODIFY COLUMN full_name VARCHAR(200) NOT NULL")
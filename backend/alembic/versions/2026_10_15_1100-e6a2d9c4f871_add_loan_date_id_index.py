@@ -0,0 +1,27 @@
+"""Add (loan_date, id) index for keyset pagination of loans
+
+Revision ID: e6a2d9c4f871
+Revises: b41e8c6a9d03
+Create Date: 2026-10-15 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a2d9c4f871'
+down_revision: Union[str, Sequence[str], None] = 'b41e8c6a9d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_loan_date_id', 'book_loans', ['loan_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_loan_date_id', table_name='book_loans')
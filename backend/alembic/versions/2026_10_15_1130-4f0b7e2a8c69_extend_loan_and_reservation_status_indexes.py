@@ -0,0 +1,37 @@
+"""Extend book/status indexes on loans and reservations to cover queue and due-date order
+
+Revision ID: 4f0b7e2a8c69
+Revises: e6a2d9c4f871
+Create Date: 2026-10-15 11:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f0b7e2a8c69'
+down_revision: Union[str, Sequence[str], None] = 'e6a2d9c4f871'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Create the wider indexes first so the book_id foreign keys always have one to use
+    op.create_index('idx_loan_book_status_due', 'book_loans', ['book_id', 'status', 'due_date'], unique=False)
+    op.create_index(
+        'idx_reservation_book_status_queue', 'book_reservations',
+        ['book_id', 'status', 'priority', 'reservation_date'], unique=False
+    )
+    op.drop_index('idx_loan_book_status', table_name='book_loans')
+    op.drop_index('idx_reservation_book_status', table_name='book_reservations')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('idx_reservation_book_status', 'book_reservations', ['book_id', 'status'], unique=False)
+    op.create_index('idx_loan_book_status', 'book_loans', ['book_id', 'status'], unique=False)
+    op.drop_index('idx_reservation_book_status_queue', table_name='book_reservations')
+    op.drop_index('idx_loan_book_status_due', table_name='book_loans')
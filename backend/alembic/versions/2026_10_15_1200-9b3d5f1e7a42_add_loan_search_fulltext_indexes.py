@@ -0,0 +1,29 @@
+"""Add FULLTEXT indexes for loan search on users and book titles
+
+Revision ID: 9b3d5f1e7a42
+Revises: 4f0b7e2a8c69
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3d5f1e7a42'
+down_revision: Union[str, Sequence[str], None] = '4f0b7e2a8c69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ft_user_search', 'users', ['username', 'email'], unique=False, mysql_prefix='FULLTEXT')
+    op.create_index('ft_book_title', 'books', ['title'], unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ft_book_title', table_name='books')
+    op.drop_index('ft_user_search', table_name='users')
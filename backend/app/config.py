@@ -9,6 +9,12 @@ class Settings(BaseSettings):
     UPLOAD_DIR: str = "uploads"
     LOG_LEVEL: str = "INFO"
     SECRET_KEY: str = "default-secret-key-change-in-production"
+    BACKUP_BUFFER_BYTES: int = 1024 * 1024  # mysqldump --net-buffer-length (max 16 MB)
+    DB_POOL_SIZE: int = 20  # Persistent connections; sized for the threadpool's concurrent handlers
+    DB_MAX_OVERFLOW: int = 20  # pool_size + overflow = anyio's default 40 worker threads
+    DB_POOL_TIMEOUT: int = 10  # Seconds to wait for a free connection; fail fast instead of piling up
+    DB_POOL_RECYCLE: int = 1800  # Below typical proxy/LB idle cutoffs, so stale sockets are replaced
+    DB_STATEMENT_TIMEOUT_MS: int = 60000  # MySQL MAX_EXECUTION_TIME for SELECTs; 0 disables
 
     def get_cors_origins(self):
         """Get CORS origins for the application"""
@@ -1,7 +1,7 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
 import logging
 
@@ -14,10 +14,10 @@ try:
         settings.DATABASE_URL,
         # Connection pooling settings
         pool_pre_ping=True,          # Test connections before use
-        pool_recycle=3600,           # Recycle connections every hour
-        pool_size=5,                 # Number of connections to maintain
-        max_overflow=10,             # Additional connections allowed
-        pool_timeout=30,             # Timeout for getting connection from pool
+        pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle connections every 30 minutes
+        pool_size=settings.DB_POOL_SIZE,        # Number of connections to maintain
+        max_overflow=settings.DB_MAX_OVERFLOW,  # Additional connections allowed
+        pool_timeout=settings.DB_POOL_TIMEOUT,  # Timeout for getting connection from pool
         
         # MySQL-specific connection arguments
         connect_args={
@@ -27,6 +27,8 @@ try:
             "charset": "utf8mb4",    # Support for full UTF-8
             "use_unicode": True,     # Enable Unicode support
             "autocommit": False,     # Disable autocommit for transactions
+            # Cap runaway SELECTs so they cannot hold a pool slot indefinitely
+            "init_command": f"SET SESSION MAX_EXECUTION_TIME={settings.DB_STATEMENT_TIMEOUT_MS}",
         },
         
         # Logging and debugging
@@ -55,6 +57,20 @@ except Exception as e:
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def commit_without_expiry(db: Session) -> None:
+    """
+    Commit without expiring loaded objects.
+
+    For create paths whose new row already holds every value the response needs,
+    so serializing it does not reload it with another SELECT.
+    """
+    previous = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = previous
+
 # Function to test database connection (called during startup)
 def test_database_connection():
     """Test database connection and create database if needed"""
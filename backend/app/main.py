@@ -1,5 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.staticfiles import StaticFiles
 from app.routers import book as book_router
 from app.routers import book_enhanced as book_enhanced_router
 from app.routers import auth as auth_router
@@ -13,6 +16,7 @@ from app.routers import auth_verify as auth_verify_router  # Add this import
 from app.routers import test_auth as test_auth_router  # Add test auth router
 from app.routers import secure_test as secure_test_router  # Add secure test router
 from app.core.db import engine, Base, test_database_connection
+from app.utils.migrations import MigrationError, MigrationInProgressError
 from app.database import SessionLocal
 from app.models import RequestLog
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -23,31 +27,39 @@ import os
 import datetime
 import json
 import re
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, RotatingFileHandler
 from app.config import settings
+from app.utils.log_queue import JSONFormatter, attach_queued_handlers, stop_log_listeners
 
 # Setup logging
 log_dir = "logs"
 os.makedirs(log_dir, exist_ok=True)
 log_level = logging.INFO  # Reduced from DEBUG to prevent excessive logging
-logging.basicConfig(
-    level=log_level,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        RotatingFileHandler(
-            f"{log_dir}/app_{datetime.datetime.now().strftime('%Y%m%d')}.log",
-            maxBytes=10485760,  # 10MB
-            backupCount=5
-        ),
-        logging.StreamHandler()
-    ]
-)
+log_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+log_handlers = [
+    RotatingFileHandler(
+        f"{log_dir}/app_{datetime.datetime.now().strftime('%Y%m%d')}.log",
+        maxBytes=52428800,  # 50MB; fewer rollovers under heavy logging
+        backupCount=5,
+        delay=True  # don't open the file until the first record is written
+    ),
+    logging.StreamHandler()
+]
+# Structured lines for the file; the console keeps the human-readable format
+log_handlers[0].setFormatter(JSONFormatter())
+log_handlers[1].setFormatter(log_formatter)
+root_logger = logging.getLogger()
+root_logger.setLevel(log_level)
+if not any(isinstance(handler, QueueHandler) for handler in root_logger.handlers):
+    # Request threads only enqueue records; file and console I/O run on the listener thread
+    attach_queued_handlers(root_logger, *log_handlers)
 logger = logging.getLogger("BookLibraryAPI")
 
 app = FastAPI(
     title="Book Library Management API",
     description="📚 A comprehensive library management system with JWT authentication, RBAC, and advanced features",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse  # orjson serializes large lists much faster than stdlib json
 )
 
 # Add CORS middleware
@@ -59,6 +71,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (HTML test pages, list endpoints)
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
 # Create database tables
 # Note: Database connection test moved to startup event
 # Base.metadata.create_all(bind=engine)  # This will be called after connection test
@@ -94,6 +109,18 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on application shutdown"""
     logger.info("🛑 Shutting down Book Library API v2...")
+    # Drain queued log records before the process exits
+    stop_log_listeners()
+
+# Translate migration failures once here instead of in every migration handler
+@app.exception_handler(MigrationInProgressError)
+async def migration_in_progress_handler(request: Request, exc: MigrationInProgressError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+@app.exception_handler(MigrationError)
+async def migration_error_handler(request: Request, exc: MigrationError):
+    logger.error(f"Migration error on {request.url.path}: {exc}")
+    return JSONResponse(status_code=500, content={"detail": str(exc)})
 
 # Include routers
 app.include_router(auth_router.router)  # Authentication & basic user operations
@@ -108,6 +135,8 @@ app.include_router(migration_router.router, prefix="/admin")  # Migration manage
 app.include_router(auth_verify_router.router)  # Auth verification router
 app.include_router(test_auth_router.router)  # Test auth router
 app.include_router(secure_test_router.router)  # Secure test router
+app.mount("/secure/js", StaticFiles(directory=secure_test_router.STATIC_JS_DIR), name="secure-js")
+app.mount("/static", StaticFiles(directory=test_auth_router.STATIC_DIR), name="static")
 
 @app.get("/")
 async def root():
@@ -125,9 +154,8 @@ async def health_check():
             conn.execute(text("SELECT 1"))
         
         # Check migration status
-        from app.utils.migrations import MigrationManager
-        migration_manager = MigrationManager()
-        status = migration_manager.check_migration_status()
+        from app.utils.migrations import get_cached_migration_status
+        status = get_cached_migration_status()
         
         return {
             "status": "healthy",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Table, ForeignKey, Date, Index, CheckConstraint, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Table, ForeignKey, Date, Index, CheckConstraint, Boolean, JSON, Computed
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.db import Base
@@ -22,7 +22,8 @@ class Author(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
-    full_name = Column(String(200), nullable=False, index=True)  # Computed field for easier searching
+    # Derived by MySQL from the name parts; never assign it directly
+    full_name = Column(String(200), Computed("CONCAT(first_name, ' ', last_name)", persisted=True), nullable=False, index=True, unique=True)
     bio = Column(Text, nullable=True)
     birth_date = Column(Date, nullable=True)  # Full birth date for precision
     death_date = Column(Date, nullable=True)  # Full death date for precision
@@ -35,7 +36,7 @@ class Author(Base):
     genres = Column(String(500), nullable=True)  # Primary writing genres (comma-separated)
     website = Column(String(255), nullable=True)
     wikipedia_url = Column(String(255), nullable=True)  # Wikipedia page link
-    social_media = Column(Text, nullable=True)  # JSON string for social media links
+    social_media = Column(JSON, nullable=True)  # Social media links keyed by platform
     is_living = Column(Boolean, default=True, nullable=False)  # True for living, False for deceased
     
     # Administrative fields
@@ -60,12 +61,13 @@ class Author(Base):
         Index('idx_author_birth_year', 'birth_year'),
         Index('idx_author_is_living', 'is_living'),
         Index('idx_author_created_at', 'created_at'),
+        # Leading-wildcard LIKE can't use B-tree indexes; text search goes through these instead
+        Index('ft_author_search', 'full_name', 'first_name', 'last_name', 'bio', 'nationality', 'genres', mysql_prefix='FULLTEXT'),
+        Index('ft_author_full_name', 'full_name', mysql_prefix='FULLTEXT'),
     )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        if 'first_name' in kwargs and 'last_name' in kwargs:
-            self.full_name = f"{kwargs['first_name']} {kwargs['last_name']}"
         
         # Auto-populate year fields from date fields if provided
         if 'birth_date' in kwargs and kwargs['birth_date']:
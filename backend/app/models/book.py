@@ -66,8 +66,12 @@ class Book(Base):
         Index('idx_book_title_genre', 'title', 'genre'),
         Index('idx_book_publisher_year', 'publisher', 'publication_year'),
         Index('idx_book_availability', 'is_available', 'available_copies'),
+        Index('idx_book_available_copies', 'available_copies'),  # available_only listings
         Index('idx_book_popularity', 'popularity_score', 'view_count'),
         Index('idx_book_created_at', 'created_at'),
+        # Leading-wildcard LIKE can't use B-tree indexes; text search goes through this instead
+        Index('ft_book_search', 'title', 'description', mysql_prefix='FULLTEXT'),
+        Index('ft_book_title', 'title', mysql_prefix='FULLTEXT'),  # loan search by title
     )
 
     @property
@@ -60,9 +60,11 @@ class BookLoan(Base):
         CheckConstraint('return_date IS NULL OR return_date >= loan_date', name='return_date_after_loan_date'),
         CheckConstraint('late_fee >= 0', name='non_negative_late_fee'),
         Index('idx_loan_user_status', 'user_id', 'status'),
-        Index('idx_loan_book_status', 'book_id', 'status'),
+        # Trailing due_date serves "earliest due active loan for a book" without a sort
+        Index('idx_loan_book_status_due', 'book_id', 'status', 'due_date'),
         Index('idx_loan_due_date', 'due_date'),
         Index('idx_loan_status_due', 'status', 'due_date'),
+        Index('idx_loan_date_id', 'loan_date', 'id'),  # keyset pagination of the loan list
     )
 
     def __init__(self, **kwargs):
@@ -73,9 +75,27 @@ class BookLoan(Base):
         elif 'due_date' not in kwargs:
             self.due_date = datetime.utcnow() + timedelta(days=14)
 
+    @staticmethod
+    def precompute_due_state(loans, now: datetime = None):
+        """
+        Evaluate is_overdue/days_until_due for a batch of loans against a single
+        clock reading, so serializing a list does not call utcnow() per row.
+        Only use on loans that are about to be returned read-only.
+        """
+        now = now or datetime.utcnow()
+        for loan in loans:
+            loan._due_state = (
+                loan.status == LoanStatus.ACTIVE and loan.due_date < now,
+                0 if loan.return_date else max(0, (loan.due_date - now).days),
+            )
+        return loans
+
     @property
     def is_overdue(self) -> bool:
         """Check if loan is overdue."""
+        due_state = self.__dict__.get("_due_state")
+        if due_state is not None:
+            return due_state[0]
         return (self.status == LoanStatus.ACTIVE and 
                 self.due_date < datetime.utcnow())
 
@@ -89,6 +109,9 @@ class BookLoan(Base):
     @property
     def days_until_due(self) -> int:
         """Calculate number of days until due."""
+        due_state = self.__dict__.get("_due_state")
+        if due_state is not None:
+            return due_state[1]
         if self.return_date:  # Already returned
             return 0
         days_remaining = (self.due_date - datetime.utcnow()).days
@@ -152,7 +175,8 @@ class BookReservation(Base):
         CheckConstraint('pickup_date IS NULL OR pickup_date >= reservation_date', name='pickup_after_reservation'),
         CheckConstraint('priority >= 1 AND priority <= 3', name='valid_priority'),
         Index('idx_reservation_user_status', 'user_id', 'status'),
-        Index('idx_reservation_book_status', 'book_id', 'status'),
+        # Matches the reservation queue lookup: book + PENDING, ordered by priority then age
+        Index('idx_reservation_book_status_queue', 'book_id', 'status', 'priority', 'reservation_date'),
         Index('idx_reservation_expiry', 'expiry_date'),
         Index('idx_reservation_priority', 'priority', 'reservation_date'),
     )
@@ -46,6 +46,8 @@ class User(Base):
         Index('idx_user_email_status', 'email', 'status'),
         Index('idx_user_role_status', 'role', 'status'),
         Index('idx_user_created_at', 'created_at'),
+        # MySQL FULLTEXT (InnoDB) for loan search by borrower
+        Index('ft_user_search', 'username', 'email', mysql_prefix='FULLTEXT'),
     )
     
     def __repr__(self):
@@ -13,7 +13,7 @@ logger = logging.getLogger("BookLibraryAPI")
 router = APIRouter(prefix="/authors", tags=["Authors"])
 
 @router.post("/", response_model=AuthorResponse, status_code=status.HTTP_201_CREATED)
-async def create_author(
+def create_author(
     author_data: AuthorCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_admin_user)  # Only admins can create authors
@@ -47,7 +47,7 @@ async def create_author(
         )
 
 @router.get("/", response_model=List[AuthorResponse])
-async def list_authors(
+def list_authors(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     search: Optional[str] = Query(None, description="Search authors by name, bio, nationality, or genres"),
@@ -85,7 +85,7 @@ async def list_authors(
         )
 
 @router.get("/statistics", response_model=Dict[str, Any])
-async def get_author_statistics(
+def get_author_statistics(
     db: Session = Depends(get_db)
 ):
     """
@@ -112,7 +112,7 @@ async def get_author_statistics(
         )
 
 @router.get("/nationality/{nationality}", response_model=List[AuthorSummary])
-async def get_authors_by_nationality(
+def get_authors_by_nationality(
     nationality: str,
     db: Session = Depends(get_db)
 ):
@@ -134,7 +134,7 @@ async def get_authors_by_nationality(
         )
 
 @router.get("/living", response_model=List[AuthorSummary])
-async def get_living_authors(
+def get_living_authors(
     db: Session = Depends(get_db)
 ):
     """
@@ -155,7 +155,7 @@ async def get_living_authors(
         )
 
 @router.get("/genre/{genre}", response_model=List[AuthorSummary])
-async def get_authors_by_genre(
+def get_authors_by_genre(
     genre: str,
     db: Session = Depends(get_db)
 ):
@@ -177,7 +177,7 @@ async def get_authors_by_genre(
         )
 
 @router.get("/decade/{decade}", response_model=List[AuthorSummary])
-async def get_authors_by_birth_decade(
+def get_authors_by_birth_decade(
     decade: int,
     db: Session = Depends(get_db)
 ):
@@ -201,7 +201,7 @@ async def get_authors_by_birth_decade(
         )
 
 @router.get("/{author_id}", response_model=AuthorWithBooks)
-async def get_author(
+def get_author(
     author_id: int,
     db: Session = Depends(get_db)
 ):
@@ -237,7 +237,7 @@ async def get_author(
         )
 
 @router.get("/{author_id}/biography", response_model=AuthorBiographical)
-async def get_author_biography(
+def get_author_biography(
     author_id: int,
     db: Session = Depends(get_db)
 ):
@@ -274,7 +274,7 @@ async def get_author_biography(
         )
 
 @router.put("/{author_id}", response_model=AuthorResponse)
-async def update_author(
+def update_author(
     author_id: int,
     author_data: AuthorUpdate,
     db: Session = Depends(get_db),
@@ -305,7 +305,7 @@ async def update_author(
         )
 
 @router.put("/{author_id}/social-media")
-async def update_author_social_media(
+def update_author_social_media(
     author_id: int,
     social_media_data: Dict[str, str] = Body(..., 
         example={
@@ -348,7 +348,7 @@ async def update_author_social_media(
         )
 
 @router.delete("/{author_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_author(
+def delete_author(
     author_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_admin_user)  # Only admins can delete authors
@@ -374,7 +374,7 @@ async def delete_author(
         )
 
 @router.get("/search/suggestions", response_model=List[AuthorSummary])
-async def get_author_suggestions(
+def get_author_suggestions(
     q: str = Query(..., min_length=2, description="Search query for author suggestions"),
     limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
     db: Session = Depends(get_db)
@@ -390,7 +390,7 @@ async def get_author_suggestions(
     """
     try:
         logger.info(f"🔍 Author suggestions for: {q}")
-        authors = AuthorService.get_authors(db, limit=limit, search=q)
+        authors = AuthorService.get_authors(db, limit=limit, search=q, summary_only=True)
         return [AuthorSummary.from_orm(author) for author in authors]
         
     except Exception as e:
@@ -1,6 +1,6 @@
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from app.models.book import Book as BookModel
 from app.schemas.book import BookResponse, BookCreate, BookUpdate, BookSummary
 from app.schemas.user import UserResponse
@@ -25,12 +25,37 @@ import os
 import logging
 import uuid
 import traceback
-from fastapi_pagination import Page, add_pagination, paginate
+from fastapi_pagination import Page, add_pagination
+from fastapi_pagination.api import create_page, resolve_params
+from sqlalchemy import func
 
 logger = logging.getLogger("BookLibraryAPI")
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
+
+def _paginate_query(query):
+    """
+    Fetch one page of ``query`` and its total row count in a single statement.
+
+    COUNT(*) OVER () rides along with the page rows, so the filtered set is
+    scanned once instead of loading every row to paginate in Python.
+    """
+    params = resolve_params()
+    raw_params = params.to_raw_params().as_limit_offset()
+    rows = (
+        query.add_columns(func.count().over().label("total_count"))
+        .offset(raw_params.offset)
+        .limit(raw_params.limit)
+        .all()
+    )
+    if rows:
+        total = rows[0].total_count
+    else:
+        # Past the last page the window has no rows to report on
+        total = query.count() if raw_params.offset else 0
+    return create_page([row[0] for row in rows], total=total, params=params)
+
 @router.post("/", response_model=BookResponse)
 async def create_book(
     title: str = Form(...),
@@ -112,13 +137,18 @@ async def create_book(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/", response_model=Page[BookSummary])
-async def get_books(
+def get_books(
     current_user: Optional[UserResponse] = Depends(get_optional_user),
     db: Session = Depends(get_db)
 ):
     """Get all books (public endpoint, authentication optional)."""
     try:
-        books = db.query(BookModel).filter(BookModel.is_available == True).all()
+        books = _paginate_query(
+            db.query(BookModel)
+            .options(selectinload(BookModel.authors))
+            .filter(BookModel.is_available == True)
+            .order_by(BookModel.id)
+        )
         
         if current_user:
             log_access_attempt(current_user, "books", "list", True)
@@ -126,13 +156,13 @@ async def get_books(
         else:
             logger.info("Anonymous user fetched books list")
             
-        return paginate(books)
+        return books
     except Exception as e:
         logger.error(f"Error fetching books: {str(e)}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/{id}", response_model=BookResponse)
-async def get_book(id: int, db: Session = Depends(get_db)):
+def get_book(id: int, db: Session = Depends(get_db)):
     book = db.query(BookModel).filter(BookModel.id == id).first()
     if not book:
         logger.warning(f"Book with id {id} not found")
@@ -198,7 +228,7 @@ async def update_book(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.delete("/{id}")
-async def delete_book(id: int, db: Session = Depends(get_db)):
+def delete_book(id: int, db: Session = Depends(get_db)):
     try:
         book = db.query(BookModel).filter(BookModel.id == id).first()
         if not book:
@@ -213,42 +243,40 @@ async def delete_book(id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/author/{author}", response_model=Page[BookSummary])
-async def get_books_by_author(author: str, db: Session = Depends(get_db)):
+def get_books_by_author(author: str, db: Session = Depends(get_db)):
     try:
         # MySQL doesn't support ILIKE; use LIKE with lower-casing for case-insensitivity
-        from sqlalchemy import func
-        books = (
+        books = _paginate_query(
             db.query(BookModel)
             .filter(func.lower(BookModel.author).like(f"%{author.lower()}%"))
-            .all()
+            .order_by(BookModel.id)
         )
         logger.info(f"Fetched books by author: {author}")
-        return paginate(books)
+        return books
     except Exception as e:
         logger.error(f"Error fetching books by author: {str(e)}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/search/", response_model=Page[BookSummary])
-async def search_books(q: str, db: Session = Depends(get_db)):
+def search_books(q: str, db: Session = Depends(get_db)):
     try:
-        from sqlalchemy import func
         q_lower = q.lower()
-        books = (
+        books = _paginate_query(
             db.query(BookModel)
             .filter(
                 (func.lower(BookModel.title).like(f"%{q_lower}%")) |
                 (func.lower(BookModel.author).like(f"%{q_lower}%"))
             )
-            .all()
+            .order_by(BookModel.id)
         )
         logger.info(f"Search query: {q}")
-        return paginate(books)
+        return books
     except Exception as e:
         logger.error(f"Error searching books: {str(e)}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.get("/filter/", response_model=Page[BookSummary])
-async def filter_books(
+def filter_books(
     genre: Optional[str] = None,
     publication_year: Optional[int] = None,
     db: Session = Depends(get_db)
@@ -256,13 +284,12 @@ async def filter_books(
     try:
         query = db.query(BookModel)
         if genre:
-            from sqlalchemy import func
             query = query.filter(func.lower(BookModel.genre).like(f"%{genre.lower()}%"))
         if publication_year:
             query = query.filter(BookModel.publication_year == publication_year)
-        books = query.all()
+        books = _paginate_query(query.options(selectinload(BookModel.authors)).order_by(BookModel.id))
         logger.info(f"Filtered books by genre: {genre}, year: {publication_year}")
-        return paginate(books)
+        return books
     except Exception as e:
         logger.error(f"Error filtering books: {str(e)}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -12,7 +12,7 @@ logger = logging.getLogger("BookLibraryAPI")
 router = APIRouter(prefix="/books", tags=["Books"])
 
 @router.post("/", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
-async def create_book(
+def create_book(
     book_data: BookCreate,
     db: Session = Depends(get_db),
     current_user = Depends(get_admin_user)  # Only admins can create books
@@ -39,7 +39,7 @@ async def create_book(
         )
 
 @router.get("/", response_model=List[BookResponse])
-async def list_books(
+def list_books(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     search: Optional[str] = Query(None, description="Search books by title or description"),
@@ -75,7 +75,7 @@ async def list_books(
         )
 
 @router.get("/{book_id}", response_model=BookResponse)
-async def get_book(
+def get_book(
     book_id: int,
     db: Session = Depends(get_db)
 ):
@@ -106,7 +106,7 @@ async def get_book(
         )
 
 @router.put("/{book_id}", response_model=BookResponse)
-async def update_book(
+def update_book(
     book_id: int,
     book_data: BookUpdate,
     db: Session = Depends(get_db),
@@ -132,7 +132,7 @@ async def update_book(
         )
 
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_book(
+def delete_book(
     book_id: int,
     db: Session = Depends(get_db),
     current_user = Depends(get_admin_user)  # Only admins can delete books
@@ -156,7 +156,7 @@ async def delete_book(
         )
 
 @router.get("/search/by-author", response_model=List[BookResponse])
-async def search_books_by_author(
+def search_books_by_author(
     author_name: str = Query(..., min_length=2, description="Author name to search for"),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of books to return"),
     db: Session = Depends(get_db)
@@ -179,7 +179,7 @@ async def search_books_by_author(
         )
 
 @router.get("/genre/{genre}", response_model=List[BookResponse])
-async def get_books_by_genre(
+def get_books_by_genre(
     genre: str,
     limit: int = Query(50, ge=1, le=100, description="Maximum number of books to return"),
     db: Session = Depends(get_db)
@@ -202,7 +202,7 @@ async def get_books_by_genre(
         )
 
 @router.get("/isbn/{isbn}", response_model=BookResponse)
-async def get_book_by_isbn(
+def get_book_by_isbn(
     isbn: str,
     db: Session = Depends(get_db)
 ):
@@ -233,7 +233,7 @@ async def get_book_by_isbn(
         )
 
 @router.post("/{book_id}/borrow")
-async def borrow_book(
+def borrow_book(
     book_id: int,
     copies: int = Query(1, ge=1, description="Number of copies to borrow"),
     db: Session = Depends(get_db),
@@ -263,7 +263,7 @@ async def borrow_book(
         )
 
 @router.post("/{book_id}/return")
-async def return_book(
+def return_book(
     book_id: int,
     copies: int = Query(1, ge=1, description="Number of copies to return"),
     db: Session = Depends(get_db),
@@ -2,6 +2,7 @@
 API routes for book loan and reservation management.
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -11,10 +12,10 @@ from app.schemas.loan import (
     BookLoanCreate, BookLoanUpdate, BookLoanResponse, BookLoanRenewal,
     BookReservationCreate, BookReservationUpdate, BookReservationResponse,
     LoanStatistics, ReservationStatistics, BookAvailabilityInfo,
-    LoanStatus, ReservationStatus, LoanListResponse
+    LoanStatus, ReservationStatus, LoanListResponse, LOAN_RESPONSE_LIST
 )
 from app.schemas.user import UserResponse
-from app.services.loan_service import LoanService, ReservationService
+from app.services.loan_service import LoanService, ReservationService, decode_loan_cursor, encode_loan_cursor
 from app.models.loan import BookLoan
 from app.utils.rbac import (
     require_admin_user,
@@ -316,12 +317,19 @@ async def get_all_loans(
     limit: int = Query(10, ge=1, le=100, description="Number of loans to return"),
     status: Optional[LoanStatus] = Query(None, description="Filter by loan status"),
     search: Optional[str] = Query(None, description="Search term for user or book"),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page; takes precedence over skip"),
     current_user: UserResponse = Depends(require_librarian_user),
     db: Session = Depends(get_db)
 ):
     """Get all loans with pagination (librarian/admin only)."""
     try:
-        total, loans = LoanService.get_all_loans(db, skip=skip, limit=limit, status=status, search=search)
+        after_key = decode_loan_cursor(after) if after else None
+    except ValueError as e:
+        # ``status`` is the filter parameter here, not fastapi.status
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        total, loans = LoanService.get_all_loans(db, skip=skip, limit=limit, status=status, search=search, after=after_key)
         
         response_loans = []
         for loan in loans:
@@ -349,8 +357,14 @@ async def get_all_loans(
                 response.user_email = loan.user.email
             response_loans.append(response)
         
+        next_cursor = encode_loan_cursor(loans[-1]) if len(loans) == limit else None
         log_access_attempt(current_user, "loans", "view_all", True)
-        return LoanListResponse(total=total, loans=response_loans)
+        return LoanListResponse(
+            total=total,
+            loans=response_loans,
+            next_cursor=next_cursor,
+            total_estimated=not (status or search)
+        )
         
     except Exception as e:
         logger.error(f"Error fetching all loans: {str(e)}")
@@ -387,7 +401,7 @@ async def get_my_loans(
         
         log_access_attempt(current_user, "loans", "view", True, f"My loans")
         logger.info(f"Successfully retrieved {len(response_loans)} loans for user {current_user.email}")
-        return response_loans
+        return ORJSONResponse(LOAN_RESPONSE_LIST.dump_python(response_loans, mode="json"))
         
     except Exception as e:
         logger.error(f"Error fetching user loans for {current_user.email}: {str(e)}")
@@ -434,7 +448,7 @@ async def get_user_loans(
             response_loans.append(response)
         
         log_access_attempt(current_user, "loans", "view", True, f"User {user_id} loans")
-        return response_loans
+        return ORJSONResponse(LOAN_RESPONSE_LIST.dump_python(response_loans, mode="json"))
         
     except Exception as e:
         logger.error(f"Error fetching user loans: {str(e)}")
@@ -476,7 +490,7 @@ async def get_my_loans(
             response_loans.append(response)
         
         logger.info(f"Retrieved {len(response_loans)} loans for user {current_user.email}")
-        return response_loans
+        return ORJSONResponse(LOAN_RESPONSE_LIST.dump_python(response_loans, mode="json"))
         
     except Exception as e:
         logger.error(f"Error fetching my loans: {str(e)}")
@@ -484,12 +498,24 @@ async def get_my_loans(
 
 @router.get("/overdue", response_model=List[BookLoanResponse])
 async def get_overdue_loans(
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Batch size; omit to return every overdue loan"),
+    after: Optional[str] = Query(None, description="X-Next-Cursor from the previous batch"),
     current_user: UserResponse = Depends(require_librarian_user),
     db: Session = Depends(get_db)
 ):
-    """Get all overdue loans (librarian/admin only)."""
+    """
+    Get overdue loans, most overdue first (librarian/admin only).
+    
+    When ``limit`` is given and a full batch is returned, the
+    ``X-Next-Cursor`` header holds the ``after`` value for the next batch.
+    """
     try:
-        loans = LoanService.get_overdue_loans(db)
+        after_key = decode_loan_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    try:
+        loans = LoanService.get_overdue_loans(db, limit=limit, after=after_key)
         
         response_loans = []
         for loan in loans:
@@ -518,7 +544,10 @@ async def get_overdue_loans(
             response_loans.append(response)
         
         log_access_attempt(current_user, "loans", "view_overdue", True)
-        return response_loans
+        response = ORJSONResponse(LOAN_RESPONSE_LIST.dump_python(response_loans, mode="json"))
+        if limit is not None and len(loans) == limit:
+            response.headers["X-Next-Cursor"] = encode_loan_cursor(loans[-1], date_field="due_date")
+        return response
         
     except Exception as e:
         logger.error(f"Error fetching overdue loans: {str(e)}")
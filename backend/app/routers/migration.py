@@ -1,21 +1,32 @@
 """
 Migration management API endpoints.
 """
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from fastapi.security import HTTPBearer
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from app.utils.migrations import MigrationManager
-from app.utils.dependencies import get_current_user
-from app.schemas.user import UserResponse
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.utils.migrations import (
+    clear_head_revision_cache,
+    clear_migration_status_cache,
+    get_cached_migration_status,
+    get_migration_manager,
+)
+from app.utils.dependencies import get_current_user, get_token_data
+from app.schemas.user import UserResponse, UserRole
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/migrations", tags=["Migration Management"])
-security = HTTPBearer()
+router = APIRouter(
+    prefix="/migrations",
+    tags=["Migration Management"],
+    default_response_class=ORJSONResponse  # history lists can be large
+)
 
 # Pydantic models for API responses
+# Response models are filled from dicts built by MigrationManager, so handlers
+# use model_construct() and skip re-validating trusted data; request models
+# below are still validated normally.
 class MigrationStatusResponse(BaseModel):
     current_revision: Optional[str]
     head_revision: Optional[str]
@@ -54,14 +65,33 @@ class MigrationResult(BaseModel):
 
 class BackupRequest(BaseModel):
     path: Optional[str] = None
+    buffer_size: Optional[int] = Field(None, ge=4096, le=16 * 1024 * 1024, description="Dump chunk size in bytes (defaults to BACKUP_BUFFER_BYTES)")
 
 class RestoreRequest(BaseModel):
     backup_path: str
 
 # Dependency to check admin privileges
-async def require_admin_user(current_user: UserResponse = Depends(get_current_user)):
-    """Require admin user for migration operations."""
-    if current_user.role != "Admin":
+async def require_admin_user(token_data: dict = Depends(get_token_data)) -> dict:
+    """Require an admin role claim for migration operations.
+
+    The role is read from the verified JWT, so read-only migration endpoints skip the
+    per-request user lookup that get_current_user performs.
+    """
+    if token_data.get("role") != UserRole.ADMIN.value:
+        raise HTTPException(
+            status_code=403,
+            detail="Admin privileges required for migration operations"
+        )
+    return token_data
+
+async def require_current_admin_user(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
+    """Require that the account is still an active admin, for operations that change the database.
+
+    A role claim stays valid until the token expires, and session revocation
+    is in-memory only; the auth cache (DB on a miss) reflects role and status
+    changes immediately.
+    """
+    if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=403,
             detail="Admin privileges required for migration operations"
@@ -69,80 +99,66 @@ async def require_admin_user(current_user: UserResponse = Depends(get_current_us
     return current_user
 
 @router.get("/status", response_model=MigrationStatusResponse)
-async def get_migration_status(current_user: UserResponse = Depends(require_admin_user)):
+async def get_migration_status(token_data: dict = Depends(require_admin_user)):
     """Get current migration status."""
-    try:
-        migration_manager = MigrationManager()
-        status = migration_manager.check_migration_status()
-        return MigrationStatusResponse(**status)
-    except Exception as e:
-        logger.error(f"Error getting migration status: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    status = get_cached_migration_status()
+    return MigrationStatusResponse.model_construct(**status)
 
 @router.get("/history", response_model=List[MigrationHistoryItem])
-async def get_migration_history(current_user: UserResponse = Depends(require_admin_user)):
+async def get_migration_history(token_data: dict = Depends(require_admin_user)):
     """Get migration history."""
-    try:
-        migration_manager = MigrationManager()
-        history = migration_manager.get_migration_history()
-        return [MigrationHistoryItem(**item) for item in history]
-    except Exception as e:
-        logger.error(f"Error getting migration history: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    migration_manager = get_migration_manager()
+    history = migration_manager.get_migration_history()
+    return [MigrationHistoryItem.model_construct(**item) for item in history]
 
 @router.get("/current")
-async def get_current_revision(current_user: UserResponse = Depends(require_admin_user)):
+async def get_current_revision(token_data: dict = Depends(require_admin_user)):
     """Get current database revision."""
-    try:
-        migration_manager = MigrationManager()
-        current = migration_manager.get_current_revision()
-        return {"current_revision": current}
-    except Exception as e:
-        logger.error(f"Error getting current revision: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    migration_manager = get_migration_manager()
+    current = migration_manager.get_current_revision()
+    return {"current_revision": current}
 
 @router.get("/head")
-async def get_head_revision(current_user: UserResponse = Depends(require_admin_user)):
+async def get_head_revision(token_data: dict = Depends(require_admin_user)):
     """Get head (latest) revision."""
-    try:
-        migration_manager = MigrationManager()
-        head = migration_manager.get_head_revision()
-        return {"head_revision": head}
-    except Exception as e:
-        logger.error(f"Error getting head revision: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    migration_manager = get_migration_manager()
+    head = migration_manager.get_head_revision()
+    return {"head_revision": head}
+
+@router.post("/cache/invalidate")
+async def invalidate_migration_cache(token_data: dict = Depends(require_admin_user)):
+    """Drop cached migration metadata so it is re-read from the scripts directory."""
+    clear_head_revision_cache()
+    clear_migration_status_cache()
+    return {"success": True, "message": "Migration cache invalidated"}
 
 @router.post("/create")
 async def create_migration(
     request: MigrationRequest,
-    current_user: UserResponse = Depends(require_admin_user)
+    current_user: UserResponse = Depends(require_current_admin_user)
 ):
     """Create a new migration."""
-    try:
-        migration_manager = MigrationManager()
-        revision = migration_manager.create_migration(
-            request.message, 
-            autogenerate=request.autogenerate
-        )
-        return {
-            "success": True,
-            "message": f"Migration created: {request.message}",
-            "revision": revision
-        }
-    except Exception as e:
-        logger.error(f"Error creating migration: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    migration_manager = get_migration_manager()
+    revision = migration_manager.create_migration(
+        request.message, 
+        autogenerate=request.autogenerate
+    )
+    clear_migration_status_cache()
+    return {
+        "success": True,
+        "message": f"Migration created: {request.message}",
+        "revision": revision
+    }
 
 @router.post("/upgrade", response_model=MigrationResult)
 async def upgrade_database(
     request: UpgradeRequest,
-    background_tasks: BackgroundTasks,
-    current_user: UserResponse = Depends(require_admin_user)
+    current_user: UserResponse = Depends(require_current_admin_user)
 ):
     """Upgrade database to specified revision."""
-    try:
-        migration_manager = MigrationManager()
-        
+    migration_manager = get_migration_manager()
+    
+    with migration_manager.migration_lock():
         if request.create_backup:
             result = migration_manager.safe_migrate(
                 request.revision, 
@@ -155,21 +171,19 @@ async def upgrade_database(
                 "message": f"Upgraded to {request.revision}" if success else "Upgrade failed",
                 "current_revision": migration_manager.get_current_revision()
             }
-        
-        return MigrationResult(**result)
-    except Exception as e:
-        logger.error(f"Error upgrading database: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    clear_migration_status_cache()
+    return MigrationResult.model_construct(**result)
 
 @router.post("/downgrade", response_model=MigrationResult)
 async def downgrade_database(
     request: DowngradeRequest,
-    current_user: UserResponse = Depends(require_admin_user)
+    current_user: UserResponse = Depends(require_current_admin_user)
 ):
     """Downgrade database to specified revision."""
-    try:
-        migration_manager = MigrationManager()
-        
+    migration_manager = get_migration_manager()
+    
+    with migration_manager.migration_lock():
         backup_path = None
         if request.create_backup:
             backup_path = migration_manager.backup_database()
@@ -182,80 +196,67 @@ async def downgrade_database(
             "backup_path": backup_path,
             "current_revision": migration_manager.get_current_revision()
         }
-        
-        return MigrationResult(**result)
-    except Exception as e:
-        logger.error(f"Error downgrading database: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    
+    clear_migration_status_cache()
+    return MigrationResult.model_construct(**result)
 
 @router.post("/backup")
 async def create_backup(
     request: BackupRequest,
-    current_user: UserResponse = Depends(require_admin_user)
+    current_user: UserResponse = Depends(require_current_admin_user)
 ):
     """Create a database backup."""
-    try:
-        migration_manager = MigrationManager()
-        backup_path = migration_manager.backup_database(request.path)
-        return {
-            "success": True,
-            "message": "Backup created successfully",
-            "backup_path": backup_path
-        }
-    except Exception as e:
-        logger.error(f"Error creating backup: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    migration_manager = get_migration_manager()
+    backup_path = migration_manager.backup_database(request.path, buffer_size=request.buffer_size)
+    return {
+        "success": True,
+        "message": "Backup created successfully",
+        "backup_path": backup_path
+    }
 
 @router.post("/restore")
 async def restore_backup(
     request: RestoreRequest,
-    current_user: UserResponse = Depends(require_admin_user)
+    current_user: UserResponse = Depends(require_current_admin_user)
 ):
     """Restore database from backup."""
-    try:
-        migration_manager = MigrationManager()
+    migration_manager = get_migration_manager()
+    with migration_manager.migration_lock():
         success = migration_manager.restore_database(request.backup_path)
-        
-        return {
-            "success": success,
-            "message": f"Restored from {request.backup_path}" if success else "Restore failed"
-        }
-    except Exception as e:
-        logger.error(f"Error restoring backup: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    clear_migration_status_cache()
+    
+    return {
+        "success": success,
+        "message": f"Restored from {request.backup_path}" if success else "Restore failed"
+    }
 
 @router.get("/pending")
-async def get_pending_migrations(current_user: UserResponse = Depends(require_admin_user)):
+async def get_pending_migrations(token_data: dict = Depends(require_admin_user)):
     """Get list of pending migrations."""
-    try:
-        migration_manager = MigrationManager()
-        pending = migration_manager.get_pending_migrations()
-        return {
-            "pending_migrations": pending,
-            "count": len(pending)
-        }
-    except Exception as e:
-        logger.error(f"Error getting pending migrations: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    # Served from the status check so polling /status and /pending walks the
+    # revision graph once
+    pending = get_cached_migration_status()["pending_migrations"]
+    return {
+        "pending_migrations": pending,
+        "count": len(pending)
+    }
 
 @router.post("/upgrade-simple")
 async def upgrade_database_simple(
-    current_user: UserResponse = Depends(require_admin_user)
+    current_user: UserResponse = Depends(require_current_admin_user)
 ):
     """Simple database upgrade without backup (for Railway environment)."""
-    try:
-        migration_manager = MigrationManager()
-        
-        # Direct upgrade without backup
+    migration_manager = get_migration_manager()
+    
+    # Direct upgrade without backup
+    with migration_manager.migration_lock():
         success = migration_manager.upgrade_database("head")
         current_revision = migration_manager.get_current_revision()
-        
-        return {
-            "success": success,
-            "message": "Database upgraded successfully" if success else "Database upgrade failed",
-            "current_revision": current_revision,
-            "backup_path": None
-        }
-    except Exception as e:
-        logger.error(f"Error upgrading database: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    clear_migration_status_cache()
+    
+    return {
+        "success": success,
+        "message": "Database upgraded successfully" if success else "Database upgrade failed",
+        "current_revision": current_revision,
+        "backup_path": None
+    }
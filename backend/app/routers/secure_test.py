@@ -1,43 +1,42 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-import os
+from fastapi.responses import HTMLResponse
+from pathlib import Path
+from app.utils.static_pages import gzip_page, html_etag, static_html_response
+import logging
 
 router = APIRouter(prefix="/secure", tags=["Security Testing"])
 
+logger = logging.getLogger("BookLibraryAPI")
+
+# Resolve asset locations relative to this package so the app runs on any host
+APP_DIR = Path(__file__).resolve().parents[1]
+TEMPLATE_PATH = APP_DIR / "templates" / "secure_login_test.html"
+
+# Served by a StaticFiles mount in app.main (ETag/304 + sendfile handled by Starlette)
+STATIC_JS_DIR = APP_DIR.parent / "static" / "js"
+
+# The template is static, so read it once at import instead of per request
+try:
+    _SECURE_LOGIN_HTML = TEMPLATE_PATH.read_text(encoding="utf-8")
+    _SECURE_LOGIN_GZ = gzip_page(_SECURE_LOGIN_HTML)
+    _SECURE_LOGIN_ETAG = html_etag(_SECURE_LOGIN_HTML)
+except FileNotFoundError:
+    _SECURE_LOGIN_HTML = None
+    _SECURE_LOGIN_GZ = None
+    _SECURE_LOGIN_ETAG = None
+    logger.warning(f"Secure login test template not found at {TEMPLATE_PATH}")
+
+if not (STATIC_JS_DIR / "password-encryption.js").is_file():
+    logger.warning(f"Password encryption script not found in {STATIC_JS_DIR}")
+
 @router.get("/login-test", response_class=HTMLResponse)
-async def secure_login_test():
+async def secure_login_test(request: Request):
     """
     Secure login test page with client-side encryption
     """
-    template_path = "/Users/aditya_takawale/Book_library_api_2/app/templates/secure_login_test.html"
-    
-    if os.path.exists(template_path):
-        with open(template_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return HTMLResponse(content=content)
-    else:
-        return HTMLResponse(
-            content="<h1>Template not found</h1><p>Secure login test template is missing.</p>",
-            status_code=404
-        )
-
-@router.get("/js/password-encryption.js")
-async def get_encryption_script():
-    """
-    Serve the password encryption JavaScript library
-    """
-    script_path = "/Users/aditya_takawale/Book_library_api_2/static/js/password-encryption.js"
-    
-    if os.path.exists(script_path):
-        return FileResponse(
-            script_path,
-            media_type="application/javascript",
-            filename="password-encryption.js"
-        )
-    else:
-        return HTMLResponse(
-            content="console.error('Password encryption script not found');",
-            status_code=404,
-            media_type="application/javascript"
-        )
+    if _SECURE_LOGIN_HTML is not None:
+        return static_html_response(request, _SECURE_LOGIN_HTML, _SECURE_LOGIN_GZ, _SECURE_LOGIN_ETAG)
+    return HTMLResponse(
+        content="<h1>Template not found</h1><p>Secure login test template is missing.</p>",
+        status_code=404
+    )
@@ -3,6 +3,17 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, date
 import json
 
+def _parse_social_media(v):
+    """Accept a mapping, or the older JSON-encoded string form from existing clients"""
+    if isinstance(v, str):
+        if not v:
+            return None
+        try:
+            return json.loads(v)
+        except json.JSONDecodeError:
+            raise ValueError('Social media must be valid JSON format')
+    return v
+
 class AuthorBase(BaseModel):
     first_name: str = Field(..., min_length=1, max_length=100, description="Author's first name")
     last_name: str = Field(..., min_length=1, max_length=100, description="Author's last name")
@@ -18,7 +29,7 @@ class AuthorBase(BaseModel):
     genres: Optional[str] = Field(None, max_length=500, description="Primary writing genres (comma-separated)")
     website: Optional[str] = Field(None, max_length=255, description="Author's official website")
     wikipedia_url: Optional[str] = Field(None, max_length=255, description="Wikipedia page URL")
-    social_media: Optional[str] = Field(None, description="Social media links (JSON format)")
+    social_media: Optional[Dict[str, str]] = Field(None, description="Social media links keyed by platform")
     is_living: Optional[int] = Field(1, description="1 for living, 0 for deceased")
 
     @validator('death_date')
@@ -41,15 +52,9 @@ class AuthorBase(BaseModel):
             return f"https://{v}"
         return v
 
-    @validator('social_media')
+    @validator('social_media', pre=True)
     def validate_social_media(cls, v):
-        if v:
-            try:
-                # Validate if it's proper JSON
-                json.loads(v)
-            except json.JSONDecodeError:
-                raise ValueError('Social media must be valid JSON format')
-        return v
+        return _parse_social_media(v)
 
 class AuthorCreate(AuthorBase):
     """Schema for creating a new author"""
@@ -71,7 +76,7 @@ class AuthorUpdate(BaseModel):
     genres: Optional[str] = Field(None, max_length=500)
     website: Optional[str] = Field(None, max_length=255)
     wikipedia_url: Optional[str] = Field(None, max_length=255)
-    social_media: Optional[str] = None
+    social_media: Optional[Dict[str, str]] = None
     is_living: Optional[int] = Field(None, description="1 for living, 0 for deceased")
 
     @validator('website', 'wikipedia_url')
@@ -80,6 +85,10 @@ class AuthorUpdate(BaseModel):
             return f"https://{v}"
         return v
 
+    @validator('social_media', pre=True)
+    def validate_social_media(cls, v):
+        return _parse_social_media(v)
+
 class AuthorResponse(AuthorBase):
     """Complete author information response"""
     id: int
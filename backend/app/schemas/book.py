@@ -1,5 +1,5 @@
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, ValidationInfo, field_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -16,9 +16,10 @@ class BookBase(BaseModel):
     total_copies: int = Field(1, gt=0, description="Total number of copies")
     available_copies: int = Field(1, ge=0, description="Number of available copies")
 
-    @validator('available_copies')
-    def validate_available_copies(cls, v, values):
-        if 'total_copies' in values and v > values['total_copies']:
+    @field_validator('available_copies')
+    @classmethod
+    def validate_available_copies(cls, v, info: ValidationInfo):
+        if 'total_copies' in info.data and v > info.data['total_copies']:
             raise ValueError('Available copies cannot exceed total copies')
         return v
 
@@ -49,8 +50,7 @@ class BookResponse(BookBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class BookSummary(BaseModel):
     """Lightweight book representation for author listings"""
@@ -60,8 +60,7 @@ class BookSummary(BaseModel):
     publication_year: int
     authors: List[AuthorSummary] = []
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class BookWithDetails(BookResponse):
     """Extended book information with full details"""
@@ -1,7 +1,7 @@
 """
 Schemas for book loan and reservation operations.
 """
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import Optional, List
 from datetime import datetime, timedelta
 from enum import Enum
@@ -30,22 +30,15 @@ class BookSummary(BaseModel):
     title: str
     authors: List[AuthorSummary] = []
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Book Loan Schemas
 class BookLoanCreate(BaseModel):
     book_id: int = Field(..., description="ID of the book to loan")
     user_id: int = Field(..., description="ID of the user borrowing the book")
-    due_date: Optional[datetime] = Field(None, description="Due date for return (defaults to 2 weeks)")
+    due_date: datetime = Field(default_factory=lambda: datetime.now() + timedelta(days=14), description="Due date for return (defaults to 2 weeks)")
     notes: Optional[str] = Field(None, max_length=500, description="Additional notes")
 
-    @validator('due_date', pre=True, always=True)
-    def set_default_due_date(cls, v):
-        if v is None:
-            return datetime.now() + timedelta(days=14)  # Default 2 weeks
-        return v
-
 class BookLoanUpdate(BaseModel):
     status: Optional[LoanStatus] = None
     return_date: Optional[datetime] = None
@@ -73,9 +66,10 @@ class BookLoanResponse(BaseModel):
     book: Optional[BookSummary] = None
     user_email: Optional[str] = None
     
-    class Config:
-        from_attributes = True
-        use_enum_values = True
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
+
+# Built once at import; list endpoints dump through it directly
+LOAN_RESPONSE_LIST = TypeAdapter(List[BookLoanResponse])
 
 class PaginatedLoanResponse(BaseModel):
     items: list[BookLoanResponse]
@@ -87,6 +81,8 @@ class PaginatedLoanResponse(BaseModel):
 class LoanListResponse(BaseModel):
     total: int
     loans: List[BookLoanResponse]
+    next_cursor: Optional[str] = None
+    total_estimated: bool = False  # True when total is a briefly cached count rather than exact
 
 class BookLoanRenewal(BaseModel):
     extension_days: int = Field(14, ge=1, le=30, description="Number of days to extend (1-30)")
@@ -96,16 +92,10 @@ class BookLoanRenewal(BaseModel):
 class BookReservationCreate(BaseModel):
     book_id: int = Field(..., description="ID of the book to reserve")
     user_id: int = Field(..., description="ID of the user making the reservation")
-    expiry_date: Optional[datetime] = Field(None, description="Expiration date (defaults to 7 days)")
+    expiry_date: datetime = Field(default_factory=lambda: datetime.now() + timedelta(days=7), description="Expiration date (defaults to 7 days)")
     priority: int = Field(1, ge=1, le=5, description="Priority level (1-5, higher is more urgent)")
     notes: Optional[str] = Field(None, max_length=500, description="Additional notes")
 
-    @validator('expiry_date', pre=True, always=True)
-    def set_default_expiry_date(cls, v):
-        if v is None:
-            return datetime.now() + timedelta(days=7)  # Default 7 days
-        return v
-
 class BookReservationUpdate(BaseModel):
     status: Optional[ReservationStatus] = None
     expiry_date: Optional[datetime] = None
@@ -132,9 +122,7 @@ class BookReservationResponse(BaseModel):
     book_title: Optional[str] = None
     user_email: Optional[str] = None
     
-    class Config:
-        from_attributes = True
-        use_enum_values = True
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
 
 # Loan Statistics
 class LoanStatistics(BaseModel):
@@ -1,9 +1,43 @@
-from pydantic import BaseModel, EmailStr, validator, Field
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, TypeAdapter, field_serializer, field_validator
+from typing import Optional, List, Dict, Any, FrozenSet
 from datetime import datetime
 from enum import Enum
 import re
 
+_USERNAME_RE = re.compile(r"^[a-zA-Z0-9_-]+$")
+_PASSWORD_SPECIAL_CHARS = frozenset('!@#$%^&*(),.?":{}|<>')
+
+_UPPER, _LOWER, _DIGIT, _SPECIAL = 1, 2, 4, 8
+_PASSWORD_RULES = (
+    (_UPPER, 'Password must contain at least one uppercase letter'),
+    (_LOWER, 'Password must contain at least one lowercase letter'),
+    (_DIGIT, 'Password must contain at least one digit'),
+    (_SPECIAL, 'Password must contain at least one special character (!@#$%^&*(),.?":{}|<>)'),
+)
+
+def check_password_strength(password: str) -> str:
+    """Validate password strength in a single pass over its characters."""
+    if len(password) < 8:
+        raise ValueError('Password must be at least 8 characters long')
+    
+    flags = 0
+    for c in password:
+        if 'A' <= c <= 'Z':
+            flags |= _UPPER
+        elif 'a' <= c <= 'z':
+            flags |= _LOWER
+        elif '0' <= c <= '9':
+            flags |= _DIGIT
+        elif c in _PASSWORD_SPECIAL_CHARS:
+            flags |= _SPECIAL
+    
+    if flags != _UPPER | _LOWER | _DIGIT | _SPECIAL:
+        for flag, message in _PASSWORD_RULES:
+            if not flags & flag:
+                raise ValueError(message)
+    
+    return password
+
 class UserRole(str, Enum):
     ADMIN = "Admin"
     LIBRARIAN = "Librarian"
@@ -24,13 +58,15 @@ class UserRegistration(BaseModel):
     last_name: Optional[str] = Field(None, max_length=100, description="Last name")
     role: UserRole = Field(UserRole.MEMBER, description="User role")
     
-    @validator('username')
+    @field_validator('username')
+    @classmethod
     def validate_username(cls, v):
-        if not re.match("^[a-zA-Z0-9_-]+$", v):
+        if not _USERNAME_RE.match(v):
             raise ValueError('Username can only contain letters, numbers, underscores, and hyphens')
         return v
     
-    @validator('password')
+    @field_validator('password')
+    @classmethod
     def validate_password_strength(cls, v):
         """
         Password requirements:
@@ -40,22 +76,7 @@ class UserRegistration(BaseModel):
         - At least one digit
         - At least one special character
         """
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        
-        if not re.search(r'[a-z]', v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one digit')
-        
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', v):
-            raise ValueError('Password must contain at least one special character (!@#$%^&*(),.?":{}|<>)')
-        
-        return v
+        return check_password_strength(v)
 
 class UserResponse(BaseModel):
     id: int
@@ -68,10 +89,17 @@ class UserResponse(BaseModel):
     email_verified: Optional[bool] = None
     created_at: datetime
     current_session_id: Optional[str] = None
-    permissions: Optional[List[str]] = []
+    # Held as a frozenset so RBAC permission checks are O(1); serialized as a sorted list
+    permissions: Optional[FrozenSet[str]] = frozenset()
+
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        from_attributes = True
+    @field_serializer('permissions')
+    def serialize_permissions(self, permissions: Optional[FrozenSet[str]]) -> Optional[List[str]]:
+        return sorted(permissions) if permissions is not None else None
+
+# Built once at import; list endpoints validate and dump through it directly
+USER_RESPONSE_LIST = TypeAdapter(List[UserResponse])
 
 class TokenResponse(BaseModel):
     """Response model for authentication endpoints"""
@@ -105,22 +133,8 @@ class PasswordChangeRequest(BaseModel):
     current_password: str = Field(..., description="Current password")
     new_password: str = Field(..., min_length=8, description="New password")
     
-    @validator('new_password')
+    @field_validator('new_password')
+    @classmethod
     def validate_new_password_strength(cls, v):
         # Same validation as registration
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        
-        if not re.search(r'[A-Z]', v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        
-        if not re.search(r'[a-z]', v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        
-        if not re.search(r'\d', v):
-            raise ValueError('Password must contain at least one digit')
-        
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', v):
-            raise ValueError('Password must contain at least one special character')
-        
-        return v
+        return check_password_strength(v)
@@ -1,68 +1,85 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, case, exists, func
+from sqlalchemy.dialects.mysql import match
 from fastapi import HTTPException, status
-from app.models.author import Author
+from app.core.db import commit_without_expiry
+from app.models.author import Author, book_author_association
 from app.schemas.author import AuthorCreate, AuthorUpdate
+from app.utils.search import LIKE_ESCAPE, boolean_prefix_query, like_escape
+from app.utils.cache import TTLCache
 from typing import List, Optional
 import logging
-import json
-from datetime import date
+from datetime import date, datetime
 
 logger = logging.getLogger("BookLibraryAPI")
 
+# Author writes clear this explicitly; the TTL only bounds staleness from
+# changes made outside this process
+AUTHOR_STATS_TTL_SECONDS = 60
+_author_stats_cache = TTLCache(ttl=AUTHOR_STATS_TTL_SECONDS, maxsize=1)
+
+# Columns behind AuthorSummary; skips the TEXT columns (bio, education, awards...)
+# and is covered by idx_author_name_nationality plus the implicit primary key
+_SUMMARY_COLUMNS = load_only(Author.id, Author.full_name, Author.nationality)
+
+# MySQL ER_DUP_ENTRY, raised when the unique full_name index rejects an insert
+MYSQL_DUPLICATE_ENTRY = 1062
+
 class AuthorService:
     
     @staticmethod
     def create_author(db: Session, author_data: AuthorCreate) -> Author:
         """Create a new author with comprehensive biographical information"""
         try:
-            # Check if author already exists (by full name)
+            # Duplicates are rejected by the unique index on the generated full_name column
             full_name = f"{author_data.first_name} {author_data.last_name}"
-            existing_author = db.query(Author).filter(Author.full_name == full_name).first()
-            
-            if existing_author:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Author '{full_name}' already exists"
-                )
             
             # Prepare author data
-            author_dict = author_data.dict(exclude_unset=True)
+            author_dict = author_data.model_dump(exclude_unset=True)
             
             # Auto-populate year fields from date fields if not provided
-            if author_data.birth_date and not author_data.birth_year:
-                author_dict['birth_year'] = author_data.birth_date.year
+            birth_date = author_dict.get('birth_date')
+            if birth_date and not author_dict.get('birth_year'):
+                author_dict['birth_year'] = birth_date.year
             
-            if author_data.death_date and not author_data.death_year:
-                author_dict['death_year'] = author_data.death_date.year
+            death_date = author_dict.get('death_date')
+            if death_date and not author_dict.get('death_year'):
+                author_dict['death_year'] = death_date.year
                 author_dict['is_living'] = 0
             
-            # Create new author
-            db_author = Author(
-                first_name=author_data.first_name,
-                last_name=author_data.last_name,
-                full_name=full_name,
-                **author_dict
-            )
+            # Create new author (first_name/last_name are required, so always in author_dict)
+            db_author = Author(**author_dict)
+            
+            # Set timestamps here so the committed object is complete without a refresh
+            # (MySQL has no INSERT ... RETURNING to hand back server defaults)
+            db_author.created_at = db_author.updated_at = datetime.now()
             
             db.add(db_author)
-            db.commit()
-            db.refresh(db_author)
+            commit_without_expiry(db)
+            # Same expression MySQL used, so there is no need to reload the generated column
+            set_committed_value(db_author, "full_name", full_name)
+            _author_stats_cache.clear()
             
-            logger.info(f"✅ Author created successfully: {full_name} (ID: {db_author.id})")
+            logger.info("✅ Author created successfully: %s (ID: %s)", full_name, db_author.id)
             return db_author
             
         except IntegrityError as e:
             db.rollback()
-            logger.error(f"❌ Database integrity error creating author: {str(e)}")
+            if e.orig is not None and e.orig.args and e.orig.args[0] == MYSQL_DUPLICATE_ENTRY:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Author '{full_name}' already exists"
+                )
+            logger.error("❌ Database integrity error creating author: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to create author due to data constraints"
             )
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Error creating author: {str(e)}")
+            logger.error("❌ Error creating author: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create author"
@@ -71,36 +88,53 @@ class AuthorService:
     @staticmethod
     def get_author_by_id(db: Session, author_id: int) -> Optional[Author]:
         """Get author by ID"""
-        return db.query(Author).filter(Author.id == author_id).first()
+        return db.get(Author, author_id)
     
     @staticmethod
     def get_author_by_name(db: Session, full_name: str) -> Optional[Author]:
         """Get author by full name"""
-        return db.query(Author).filter(Author.full_name.ilike(f"%{full_name}%")).first()
+        fulltext_query = boolean_prefix_query(full_name)
+        if fulltext_query:
+            return db.query(Author).filter(
+                match(Author.full_name, against=fulltext_query).in_boolean_mode()
+            ).first()
+        return db.query(Author).filter(Author.full_name.like(f"%{like_escape(full_name)}%", escape=LIKE_ESCAPE)).first()
     
     @staticmethod
     def get_authors(db: Session, skip: int = 0, limit: int = 100, search: str = None, 
                    nationality: str = None, is_living: bool = None, 
-                   birth_year_start: int = None, birth_year_end: int = None) -> List[Author]:
+                   birth_year_start: int = None, birth_year_end: int = None,
+                   summary_only: bool = False) -> List[Author]:
         """Get all authors with advanced filtering options"""
         query = db.query(Author)
+        if summary_only:
+            query = query.options(_SUMMARY_COLUMNS)
         
-        # Text search
-        if search:
+        # Text search: one lookup on the ft_author_search FULLTEXT index, best matches first
+        fulltext_query = boolean_prefix_query(search) if search else None
+        if fulltext_query:
+            relevance = match(
+                Author.full_name, Author.first_name, Author.last_name,
+                Author.bio, Author.nationality, Author.genres,
+                against=fulltext_query
+            ).in_boolean_mode()
+            query = query.filter(relevance).order_by(relevance.desc())
+        elif search:
+            pattern = f"%{like_escape(search)}%"
             query = query.filter(
                 or_(
-                    Author.full_name.ilike(f"%{search}%"),
-                    Author.first_name.ilike(f"%{search}%"),
-                    Author.last_name.ilike(f"%{search}%"),
-                    Author.bio.ilike(f"%{search}%"),
-                    Author.nationality.ilike(f"%{search}%"),
-                    Author.genres.ilike(f"%{search}%")
+                    Author.full_name.like(pattern, escape=LIKE_ESCAPE),
+                    Author.first_name.like(pattern, escape=LIKE_ESCAPE),
+                    Author.last_name.like(pattern, escape=LIKE_ESCAPE),
+                    Author.bio.like(pattern, escape=LIKE_ESCAPE),
+                    Author.nationality.like(pattern, escape=LIKE_ESCAPE),
+                    Author.genres.like(pattern, escape=LIKE_ESCAPE)
                 )
             )
         
         # Nationality filter
         if nationality:
-            query = query.filter(Author.nationality.ilike(f"%{nationality}%"))
+            query = query.filter(Author.nationality.like(f"{like_escape(nationality)}%", escape=LIKE_ESCAPE))
         
         # Living status filter
         if is_living is not None:
@@ -116,25 +150,35 @@ class AuthorService:
     
     @staticmethod
     def get_authors_by_nationality(db: Session, nationality: str) -> List[Author]:
-        """Get all authors from a specific nationality"""
-        return db.query(Author).filter(Author.nationality.ilike(f"%{nationality}%")).all()
+        """Get all authors from a specific nationality; loads summary columns only"""
+        return (
+            db.query(Author)
+            .options(_SUMMARY_COLUMNS)
+            .filter(Author.nationality.like(f"{like_escape(nationality)}%", escape=LIKE_ESCAPE))
+            .all()
+        )
     
     @staticmethod
     def get_living_authors(db: Session) -> List[Author]:
-        """Get all living authors"""
-        return db.query(Author).filter(Author.is_living == 1).all()
+        """Get all living authors; loads summary columns only"""
+        return db.query(Author).options(_SUMMARY_COLUMNS).filter(Author.is_living == 1).all()
     
     @staticmethod
     def get_authors_by_genre(db: Session, genre: str) -> List[Author]:
-        """Get authors who write in a specific genre"""
-        return db.query(Author).filter(Author.genres.ilike(f"%{genre}%")).all()
+        """Get authors who write in a specific genre; loads summary columns only"""
+        return (
+            db.query(Author)
+            .options(_SUMMARY_COLUMNS)
+            .filter(Author.genres.like(f"%{like_escape(genre)}%", escape=LIKE_ESCAPE))
+            .all()
+        )
     
     @staticmethod
     def get_authors_by_birth_decade(db: Session, decade: int) -> List[Author]:
-        """Get authors born in a specific decade (e.g., 1950 for 1950s)"""
+        """Get authors born in a specific decade (e.g., 1950 for 1950s); loads summary columns only"""
         start_year = decade
         end_year = decade + 9
-        return db.query(Author).filter(
+        return db.query(Author).options(_SUMMARY_COLUMNS).filter(
             and_(Author.birth_year >= start_year, Author.birth_year <= end_year)
         ).all()
     
@@ -150,13 +194,7 @@ class AuthorService:
                 )
             
             # Update fields if provided
-            update_data = author_data.dict(exclude_unset=True)
-            
-            # Update full_name if first_name or last_name changed
-            if 'first_name' in update_data or 'last_name' in update_data:
-                first_name = update_data.get('first_name', author.first_name)
-                last_name = update_data.get('last_name', author.last_name)
-                update_data['full_name'] = f"{first_name} {last_name}"
+            update_data = author_data.model_dump(exclude_unset=True)
             
             # Auto-populate year fields from date fields if provided
             if 'birth_date' in update_data and update_data['birth_date']:
@@ -175,15 +213,28 @@ class AuthorService:
             
             db.commit()
             db.refresh(author)
+            _author_stats_cache.clear()
             
-            logger.info(f"✅ Author updated successfully: {author.full_name} (ID: {author.id})")
+            logger.info("✅ Author updated successfully: %s (ID: %s)", author.full_name, author.id)
             return author
             
         except HTTPException:
             raise
+        except IntegrityError as e:
+            db.rollback()
+            if e.orig is not None and e.orig.args and e.orig.args[0] == MYSQL_DUPLICATE_ENTRY:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Another author with this name already exists"
+                )
+            logger.error("❌ Database integrity error updating author %s: %s", author_id, e)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to update author due to data constraints"
+            )
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Error updating author {author_id}: {str(e)}")
+            logger.error("❌ Error updating author %s: %s", author_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to update author"
@@ -200,18 +251,17 @@ class AuthorService:
                     detail="Author not found"
                 )
             
-            # Convert dict to JSON string
-            author.social_media = json.dumps(social_media_data)
+            author.social_media = social_media_data
             
             db.commit()
             db.refresh(author)
             
-            logger.info(f"✅ Author social media updated: {author.full_name} (ID: {author.id})")
+            logger.info("✅ Author social media updated: %s (ID: %s)", author.full_name, author.id)
             return author
             
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Error updating author social media {author_id}: {str(e)}")
+            logger.error("❌ Error updating author social media %s: %s", author_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to update author social media"
@@ -228,24 +278,34 @@ class AuthorService:
                     detail="Author not found"
                 )
             
-            # Check if author has associated books
-            if author.books:
+            # Check if author has associated books without loading them
+            has_books = db.query(
+                exists().where(book_author_association.c.author_id == author_id)
+            ).scalar()
+            if has_books:
+                book_count = (
+                    db.query(func.count())
+                    .select_from(book_author_association)
+                    .filter(book_author_association.c.author_id == author_id)
+                    .scalar()
+                )
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Cannot delete author '{author.full_name}' - they have {len(author.books)} associated books"
+                    detail=f"Cannot delete author '{author.full_name}' - they have {book_count} associated books"
                 )
             
             db.delete(author)
             db.commit()
+            _author_stats_cache.clear()
             
-            logger.info(f"✅ Author deleted successfully: {author.full_name} (ID: {author.id})")
+            logger.info("✅ Author deleted successfully: %s (ID: %s)", author.full_name, author.id)
             return True
             
         except HTTPException:
             raise
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Error deleting author {author_id}: {str(e)}")
+            logger.error("❌ Error deleting author %s: %s", author_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete author"
@@ -255,40 +315,62 @@ class AuthorService:
     def get_authors_by_ids(db: Session, author_ids: List[int]) -> List[Author]:
         """Get multiple authors by their IDs"""
         authors = db.query(Author).filter(Author.id.in_(author_ids)).all()
-        found_ids = [author.id for author in authors]
-        missing_ids = [author_id for author_id in author_ids if author_id not in found_ids]
+        AuthorService.ensure_all_found(author_ids, authors)
+        return authors
+    
+    @staticmethod
+    def ensure_all_found(author_ids: List[int], authors: List[Author]) -> None:
+        """Raise 404 listing any requested author IDs missing from ``authors``"""
+        found_ids = {author.id for author in authors}
+        missing_ids = [author_id for author_id in dict.fromkeys(author_ids) if author_id not in found_ids]
         
         if missing_ids:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Authors not found with IDs: {missing_ids}"
             )
-        
-        return authors
     
     @staticmethod
     def get_author_statistics(db: Session) -> dict:
         """Get comprehensive author statistics"""
-        total_authors = db.query(Author).count()
-        living_authors = db.query(Author).filter(Author.is_living == 1).count()
-        deceased_authors = db.query(Author).filter(Author.is_living == 0).count()
+        cached = _author_stats_cache.get("statistics")
+        if cached is not None:
+            return cached
+        
+        # One pass for the counts; COUNT(column) skips NULLs, so it doubles as "with X"
+        row = db.query(
+            func.count(Author.id),
+            func.sum(case((Author.is_living == 1, 1), else_=0)),
+            func.sum(case((Author.is_living == 0, 1), else_=0)),
+            func.count(Author.bio),
+            func.count(Author.birth_date),
+            func.count(Author.nationality),
+            func.count(Author.education),
+            func.count(Author.awards)
+        ).one()
+        (total_authors, living_authors, deceased_authors, with_bio,
+         with_birth_date, with_nationality, with_education, with_awards) = [int(value or 0) for value in row]
         
         # Get nationality distribution
-        nationality_stats = db.query(Author.nationality).filter(Author.nationality.isnot(None)).all()
-        nationality_counts = {}
-        for (nationality,) in nationality_stats:
-            nationality_counts[nationality] = nationality_counts.get(nationality, 0) + 1
+        nationality_counts = dict(
+            db.query(Author.nationality, func.count(Author.id))
+            .filter(Author.nationality.isnot(None))
+            .group_by(Author.nationality)
+            .all()
+        )
         
-        return {
+        stats = {
             "total_authors": total_authors,
             "living_authors": living_authors,
             "deceased_authors": deceased_authors,
             "nationality_distribution": nationality_counts,
             "completion_stats": {
-                "with_bio": db.query(Author).filter(Author.bio.isnot(None)).count(),
-                "with_birth_date": db.query(Author).filter(Author.birth_date.isnot(None)).count(),
-                "with_nationality": db.query(Author).filter(Author.nationality.isnot(None)).count(),
-                "with_education": db.query(Author).filter(Author.education.isnot(None)).count(),
-                "with_awards": db.query(Author).filter(Author.awards.isnot(None)).count()
+                "with_bio": with_bio,
+                "with_birth_date": with_birth_date,
+                "with_nationality": with_nationality,
+                "with_education": with_education,
+                "with_awards": with_awards
             }
         }
+        _author_stats_cache.set("statistics", stats)
+        return stats
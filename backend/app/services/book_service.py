@@ -1,12 +1,19 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import exists, insert, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.mysql import match
 from fastapi import HTTPException, status
+from app.core.db import commit_without_expiry
 from app.models.book import Book
-from app.models.author import Author
+from app.models.author import Author, book_author_association
 from app.schemas.book import BookCreate, BookUpdate
 from app.services.author_service import AuthorService
+from app.services.loan_service import invalidate_book_availability
+from app.utils.search import LIKE_ESCAPE, boolean_prefix_query, like_escape
 from typing import List, Optional
 import logging
+from datetime import datetime
 
 logger = logging.getLogger("BookLibraryAPI")
 
@@ -16,34 +23,49 @@ class BookService:
     def create_book(db: Session, book_data: BookCreate) -> Book:
         """Create a new book with multiple authors"""
         try:
-            # Validate authors exist
-            authors = AuthorService.get_authors_by_ids(db, book_data.author_ids)
-            
-            # Check for duplicate ISBN if provided
+            # Validate authors and ISBN uniqueness in a single round-trip
+            query = db.query(Author)
             if book_data.isbn:
-                existing_book = db.query(Book).filter(Book.isbn == book_data.isbn).first()
-                if existing_book:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Book with ISBN '{book_data.isbn}' already exists"
-                    )
+                query = query.add_columns(exists().where(Book.isbn == book_data.isbn).label("isbn_taken"))
+            rows = query.filter(Author.id.in_(book_data.author_ids)).all()
+            
+            authors = [row[0] for row in rows] if book_data.isbn else rows
+            AuthorService.ensure_all_found(book_data.author_ids, authors)
+            
+            if book_data.isbn and rows[0].isbn_taken:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Book with ISBN '{book_data.isbn}' already exists"
+                )
             
             # Create book record
-            book_dict = book_data.dict(exclude={'author_ids'})
+            book_dict = book_data.model_dump(exclude={'author_ids'})
             db_book = Book(**book_dict)
             
             # Set availability based on copies
-            db_book.is_available = book_data.available_copies > 0
+            db_book.is_available = book_dict['available_copies'] > 0
             
-            # Associate authors
-            db_book.authors = authors
+            # Set timestamps here so the committed object is complete without a refresh
+            db_book.created_at = db_book.updated_at = datetime.now()
             
             db.add(db_book)
-            db.commit()
-            db.refresh(db_book)
+            db.flush()
+            
+            # Write every book_authors row in one multi-row INSERT, keeping the requested author order
+            db.execute(
+                insert(book_author_association),
+                [
+                    {"book_id": db_book.id, "author_id": author_id, "order": position}
+                    for position, author_id in enumerate(dict.fromkeys(book_data.author_ids), start=1)
+                ]
+            )
+            # Already persisted above, so attach without the unit of work inserting them again
+            set_committed_value(db_book, "authors", authors)
+            commit_without_expiry(db)
             
-            author_names = [author.full_name for author in authors]
-            logger.info(f"✅ Book created successfully: '{db_book.title}' by {', '.join(author_names)} (ID: {db_book.id})")
+            if logger.isEnabledFor(logging.INFO):
+                author_names = ', '.join(author.full_name for author in authors)
+                logger.info("✅ Book created successfully: '%s' by %s (ID: %s)", db_book.title, author_names, db_book.id)
             return db_book
             
         except HTTPException:
@@ -51,14 +73,14 @@ class BookService:
             raise
         except IntegrityError as e:
             db.rollback()
-            logger.error(f"❌ Database integrity error creating book: {str(e)}")
+            logger.error("❌ Database integrity error creating book: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Failed to create book due to data constraints"
             )
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Error creating book: {str(e)}")
+            logger.error("❌ Error creating book: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create book"
@@ -67,12 +89,12 @@ class BookService:
     @staticmethod
     def get_book_by_id(db: Session, book_id: int) -> Optional[Book]:
         """Get book by ID with authors"""
-        return db.query(Book).filter(Book.id == book_id).first()
+        return db.get(Book, book_id, options=[selectinload(Book.authors)])
     
     @staticmethod
     def get_book_by_isbn(db: Session, isbn: str) -> Optional[Book]:
         """Get book by ISBN"""
-        return db.query(Book).filter(Book.isbn == isbn).first()
+        return db.query(Book).options(selectinload(Book.authors)).filter(Book.isbn == isbn).first()
     
     @staticmethod
     def get_books(
@@ -85,17 +107,26 @@ class BookService:
         available_only: bool = False
     ) -> List[Book]:
         """Get books with optional filtering and pagination"""
-        query = db.query(Book)
+        # Load authors for the whole page in one IN query instead of one per book
+        query = db.query(Book).options(selectinload(Book.authors))
         
         # Apply filters
         if search:
-            query = query.filter(
-                Book.title.ilike(f"%{search}%") |
-                Book.description.ilike(f"%{search}%")
-            )
+            fulltext_query = boolean_prefix_query(search)
+            if fulltext_query:
+                # Served by the ft_book_search FULLTEXT index
+                query = query.filter(
+                    match(Book.title, Book.description, against=fulltext_query).in_boolean_mode()
+                )
+            else:
+                pattern = f"%{like_escape(search)}%"
+                query = query.filter(
+                    Book.title.like(pattern, escape=LIKE_ESCAPE) |
+                    Book.description.like(pattern, escape=LIKE_ESCAPE)
+                )
         
         if genre:
-            query = query.filter(Book.genre.ilike(f"%{genre}%"))
+            query = query.filter(Book.genre.like(f"%{like_escape(genre)}%", escape=LIKE_ESCAPE))
         
         if author_id:
             query = query.join(Book.authors).filter(Author.id == author_id)
@@ -131,7 +162,7 @@ class BookService:
                 book.authors = authors
             
             # Update other fields
-            update_data = book_data.dict(exclude_unset=True, exclude={'author_ids'})
+            update_data = book_data.model_dump(exclude_unset=True, exclude={'author_ids'})
             for field, value in update_data.items():
                 setattr(book, field, value)
             
@@ -141,15 +172,16 @@ class BookService:
             
             db.commit()
             db.refresh(book)
+            invalidate_book_availability(book_id)
             
-            logger.info(f"✅ Book updated successfully: '{book.title}' (ID: {book.id})")
+            logger.info("✅ Book updated successfully: '%s' (ID: %s)", book.title, book.id)
             return book
             
         except HTTPException:
             raise
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Error updating book {book_id}: {str(e)}")
+            logger.error("❌ Error updating book %s: %s", book_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to update book"
@@ -168,15 +200,16 @@ class BookService:
             
             db.delete(book)
             db.commit()
+            invalidate_book_availability(book_id)
             
-            logger.info(f"✅ Book deleted successfully: '{book.title}' (ID: {book.id})")
+            logger.info("✅ Book deleted successfully: '%s' (ID: %s)", book.title, book.id)
             return True
             
         except HTTPException:
             raise
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Error deleting book {book_id}: {str(e)}")
+            logger.error("❌ Error deleting book %s: %s", book_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to delete book"
@@ -187,8 +220,9 @@ class BookService:
         """Search books by author name"""
         return (
             db.query(Book)
+            .options(selectinload(Book.authors))
             .join(Book.authors)
-            .filter(Author.full_name.ilike(f"%{author_name}%"))
+            .filter(Author.full_name.like(f"%{like_escape(author_name)}%", escape=LIKE_ESCAPE))
             .limit(limit)
             .all()
         )
@@ -198,7 +232,8 @@ class BookService:
         """Get books by genre"""
         return (
             db.query(Book)
-            .filter(Book.genre.ilike(f"%{genre}%"))
+            .options(selectinload(Book.authors))
+            .filter(Book.genre.like(f"%{like_escape(genre)}%", escape=LIKE_ESCAPE))
             .limit(limit)
             .all()
         )
@@ -207,35 +242,44 @@ class BookService:
     def update_book_availability(db: Session, book_id: int, copies_borrowed: int = 1) -> Book:
         """Update book availability when borrowed/returned"""
         try:
-            book = BookService.get_book_by_id(db, book_id)
-            if not book:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Book not found"
+            # Check and decrement in one statement so concurrent borrows cannot oversubscribe.
+            # MySQL applies SET assignments left to right, so is_available goes first and
+            # is derived from the pre-update count.
+            result = db.execute(
+                update(Book)
+                .where(Book.id == book_id, Book.available_copies >= copies_borrowed)
+                .ordered_values(
+                    (Book.is_available, Book.available_copies > copies_borrowed),
+                    (Book.available_copies, Book.available_copies - copies_borrowed),
                 )
+                .execution_options(synchronize_session=False)
+            )
             
-            new_available = book.available_copies - copies_borrowed
-            if new_available < 0:
+            if result.rowcount == 0:
+                db.rollback()
+                if not db.query(exists().where(Book.id == book_id)).scalar():
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Book not found"
+                    )
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Not enough copies available"
                 )
             
-            book.available_copies = new_available
-            book.is_available = new_available > 0
-            
             db.commit()
-            db.refresh(book)
+            invalidate_book_availability(book_id)
+            book = db.get(Book, book_id, populate_existing=True)
             
             action = "borrowed" if copies_borrowed > 0 else "returned"
-            logger.info(f"✅ Book {action}: '{book.title}' - Available copies: {book.available_copies}")
+            logger.info("✅ Book %s: '%s' - Available copies: %s", action, book.title, book.available_copies)
             return book
             
         except HTTPException:
             raise
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Error updating book availability {book_id}: {str(e)}")
+            logger.error("❌ Error updating book availability %s: %s", book_id, e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to update book availability"
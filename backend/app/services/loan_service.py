@@ -1,24 +1,116 @@
 """
 Service layer for book loan and reservation management.
 """
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, desc, asc
-from typing import List, Optional, Dict, Any
+from sqlalchemy.orm import Session, joinedload, contains_eager, selectinload, load_only
+from sqlalchemy import and_, or_, desc, asc, tuple_, func, case, update, literal_column, select, exists, lambda_stmt
+from sqlalchemy.dialects.mysql import match
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
+import base64
 
 from app.models.loan import BookLoan, BookReservation, LoanStatus, ReservationStatus
 from app.models.book import Book
+from app.models.author import Author
 from app.models.user import User
 from app.schemas.loan import (
     BookLoanCreate, BookLoanUpdate, BookLoanResponse,
     BookReservationCreate, BookReservationUpdate, BookReservationResponse,
     LoanStatistics, ReservationStatistics, BookAvailabilityInfo
 )
+from app.utils.cache import TTLCache
+from app.utils.search import LIKE_ESCAPE, boolean_prefix_query, like_escape
 import logging
 
 logger = logging.getLogger("LoanService")
 
+LOAN_COUNT_TTL_SECONDS = 30
+_loan_count_cache = TTLCache(ttl=LOAN_COUNT_TTL_SECONDS, maxsize=1)
+
+# Per-book availability snapshots; every loan/reservation write path drops its book's entry
+BOOK_AVAILABILITY_TTL_SECONDS = 60
+_availability_cache = TTLCache(ttl=BOOK_AVAILABILITY_TTL_SECONDS, maxsize=4096)
+
+
+def invalidate_book_availability(book_id: int) -> None:
+    """Drop a book's cached availability after a write outside the loan service."""
+    _availability_cache.pop(book_id)
+
+# Rows per transaction in the overdue/expiry sweeps, so a large backlog never
+# holds row locks on book_loans/book_reservations in one long transaction
+SWEEP_BATCH_SIZE = 500
+
+
+# Pages up to this size load book/user with a JOIN in the same statement; larger
+# or unpaginated results batch them with selectin IN queries instead, so rows
+# don't repeat wide book columns and the statement stays small.
+JOINED_LOAD_MAX_ROWS = 100
+
+
+def _apply_loading(query, limit: Optional[int] = None, include_user: bool = False):
+    """
+    Attach the eager-loading strategy for loan lists that render book/user.
+
+    Lazy loading is never used: every row's book (and authors) is serialized,
+    so it would cost one query per loan.
+    """
+    if limit is not None and limit <= JOINED_LOAD_MAX_ROWS:
+        book_loader, user_loader = joinedload(BookLoan.book), joinedload(BookLoan.user)
+    else:
+        book_loader, user_loader = selectinload(BookLoan.book), selectinload(BookLoan.user)
+    options = [book_loader.selectinload(Book.authors)]
+    if include_user:
+        options.append(user_loader)
+    return query.options(*options)
+
+
+def _loan_search_condition(search: str):
+    """
+    WHERE clause matching loans by borrower username/email or book title/ISBN.
+
+    Matching users and books are resolved through their FULLTEXT indexes
+    (ft_user_search, ft_book_title) and the ISBN b-tree by prefix, so the
+    loan scan only probes id lists instead of evaluating four ``%term%``
+    patterns on every joined row. Terms with short words or stopwords (e.g.
+    two-letter usernames) are not in those indexes and keep the substring scan.
+    """
+    fulltext_query = boolean_prefix_query(search, strict=True)
+    if not fulltext_query:
+        pattern = f"%{like_escape(search)}%"
+        return or_(
+            User.username.like(pattern, escape=LIKE_ESCAPE),
+            User.email.like(pattern, escape=LIKE_ESCAPE),
+            Book.title.like(pattern, escape=LIKE_ESCAPE),
+            Book.isbn.like(pattern, escape=LIKE_ESCAPE)
+        )
+
+    matching_users = select(User.id).where(
+        match(User.username, User.email, against=fulltext_query).in_boolean_mode()
+    )
+    matching_books = select(Book.id).where(
+        or_(
+            match(Book.title, against=fulltext_query).in_boolean_mode(),
+            Book.isbn.like(f"{like_escape(search.strip())}%", escape=LIKE_ESCAPE)
+        )
+    )
+    return or_(BookLoan.user_id.in_(matching_users), BookLoan.book_id.in_(matching_books))
+
+
+def encode_loan_cursor(loan: BookLoan, date_field: str = "loan_date") -> str:
+    """Opaque keyset cursor pointing just past ``loan`` in ``date_field``/id order."""
+    raw = f"{getattr(loan, date_field).isoformat()}|{loan.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_loan_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_loan_cursor; raises ValueError on malformed input."""
+    try:
+        loan_date, loan_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(loan_date), int(loan_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
 class LoanService:
     """Service for managing book loans."""
     
@@ -26,26 +118,32 @@ class LoanService:
     def create_loan(db: Session, loan_data: dict, user_id: int) -> BookLoan:
         """Create a new book loan."""
         book_id = loan_data.get("book_id")
-        # Check book availability
-        book = db.query(Book).filter(Book.id == book_id).first()
-        if not book:
-            raise ValueError("Book not found")
-        
-        if book.available_copies <= 0:
-            raise ValueError("No copies available for loan")
         
         # Check if user already has an active loan for this book
-        existing_loan = db.query(BookLoan).filter(
-            and_(
+        has_active_loan = db.query(
+            exists().where(
                 BookLoan.book_id == book_id,
                 BookLoan.user_id == user_id,
                 BookLoan.status.in_([LoanStatus.ACTIVE, LoanStatus.RENEWED])
             )
-        ).first()
+        ).scalar()
         
-        if existing_loan:
+        if has_active_loan:
             raise ValueError("User already has an active loan for this book")
         
+        # Claim a copy atomically so concurrent loans cannot take the last copy twice
+        result = db.execute(
+            update(Book)
+            .where(Book.id == book_id, Book.available_copies > 0)
+            .values(available_copies=Book.available_copies - 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            if not db.query(exists().where(Book.id == book_id)).scalar():
+                raise ValueError("Book not found")
+            raise ValueError("No copies available for loan")
+        
         # Create loan
         loan = BookLoan(
             book_id=book_id,
@@ -55,13 +153,11 @@ class LoanService:
             status=LoanStatus.ACTIVE
         )
         
-        # Update book availability
-        book.available_copies -= 1
-        book.update_popularity_score()
-        
         db.add(loan)
         db.commit()
         db.refresh(loan)
+        _loan_count_cache.clear()
+        _availability_cache.pop(book_id)
         
         logger.info(f"Loan created: Book {book_id} to User {user_id}")
         return loan
@@ -89,8 +185,8 @@ class LoanService:
             days_overdue = (datetime.now() - loan.due_date).days
             loan.fine_amount = Decimal(str(days_overdue * 1.00))  # $1 per day
         
-        # Update book availability
-        book = db.query(Book).filter(Book.id == loan.book_id).first()
+        # Update book availability; the book was loaded with the loan above
+        book = loan.book
         if book:
             book.available_copies += 1
         
@@ -99,6 +195,7 @@ class LoanService:
         
         db.commit()
         db.refresh(loan)
+        _availability_cache.pop(loan.book_id)
         
         logger.info(f"Book returned: Loan {loan_id}")
         return loan
@@ -118,15 +215,15 @@ class LoanService:
         if loan.renewal_count >= 2:  # Max 2 renewals
             raise ValueError("Maximum renewal limit reached")
         
-        # Check if there are pending reservations
-        pending_reservations = db.query(BookReservation).filter(
-            and_(
+        # Check if there are pending reservations; EXISTS stops at the first queued row
+        has_pending_reservations = db.query(
+            exists().where(
                 BookReservation.book_id == loan.book_id,
                 BookReservation.status == ReservationStatus.PENDING
             )
-        ).count()
+        ).scalar()
         
-        if pending_reservations > 0:
+        if has_pending_reservations:
             raise ValueError("Cannot renew: Book has pending reservations")
         
         # Renew loan
@@ -136,6 +233,7 @@ class LoanService:
         
         db.commit()
         db.refresh(loan)
+        _availability_cache.pop(loan.book_id)
         
         logger.info(f"Loan renewed: {loan_id} for {extension_days} days")
         return loan
@@ -143,95 +241,146 @@ class LoanService:
     @staticmethod
     def get_user_loans(db: Session, user_id: int, status: Optional[LoanStatus] = None) -> List[BookLoan]:
         """Get loans for a specific user."""
-        from sqlalchemy.orm import joinedload
-        from app.models.book import Book
-        
         query = db.query(BookLoan).filter(BookLoan.user_id == user_id)
         
         if status:
             query = query.filter(BookLoan.status == status)
         
-        # Eagerly load book and author relationships
-        query = query.options(
-            joinedload(BookLoan.book).joinedload(Book.authors)
-        )
+        # Unpaginated, so batch the book/author loads
+        query = _apply_loading(query)
         
-        return query.order_by(desc(BookLoan.loan_date)).all()
+        return BookLoan.precompute_due_state(query.order_by(desc(BookLoan.loan_date)).all())
     
     @staticmethod
-    def get_overdue_loans(db: Session) -> List[BookLoan]:
-        """Get all overdue loans."""
-        from sqlalchemy.orm import joinedload
-        
-        return db.query(BookLoan).filter(
+    def get_overdue_loans(db: Session, limit: Optional[int] = None,
+                          after: Optional[Tuple[datetime, int]] = None) -> List[BookLoan]:
+        """
+        Get overdue loans, most overdue first.
+        
+        With ``limit``, pass the decoded cursor of the last row as ``after`` to
+        fetch the next batch; each batch is a range scan on idx_loan_status_due.
+        """
+        query = db.query(BookLoan).filter(
             and_(
                 BookLoan.status.in_([LoanStatus.ACTIVE, LoanStatus.RENEWED]),
                 BookLoan.due_date < datetime.now()
             )
-        ).options(
-            joinedload(BookLoan.book).joinedload(Book.authors),
-            joinedload(BookLoan.user)
-        ).all()
+        ).order_by(asc(BookLoan.due_date), asc(BookLoan.id))
+        if after:
+            query = query.filter(tuple_(BookLoan.due_date, BookLoan.id) > tuple_(*after))
+        if limit is not None:
+            query = query.limit(limit)
+        return _apply_loading(query, limit=limit, include_user=True).all()
     
     @staticmethod
-    def get_all_loans(db: Session, skip: int = 0, limit: int = 10, status: Optional[LoanStatus] = None, search: Optional[str] = None) -> tuple[int, List[BookLoan]]:
-        """Get all loans with pagination, filtering, and searching."""
-        from sqlalchemy.orm import joinedload
-        
+    def count_all_loans(db: Session) -> int:
+        """
+        Total number of loans, cached briefly.
+
+        The unfiltered loan list only needs this for paging controls, so a
+        count that lags by a few seconds is fine and saves a full index scan
+        on every page load.
+        """
+        total = _loan_count_cache.get("total")
+        if total is None:
+            total = db.query(func.count(BookLoan.id)).scalar() or 0
+            _loan_count_cache.set("total", total)
+        return total
+    
+    @staticmethod
+    def get_all_loans(db: Session, skip: int = 0, limit: int = 10, status: Optional[LoanStatus] = None, search: Optional[str] = None,
+                      after: Optional[Tuple[datetime, int]] = None) -> tuple[int, List[BookLoan]]:
+        """
+        Get all loans with pagination, filtering, and searching.
+        
+        Pass ``after`` (a decoded cursor) to continue from a previous page by
+        keyset instead of ``skip``; deep pages then cost the same as the first.
+        """
         query = db.query(BookLoan).join(Book, BookLoan.book_id == Book.id).join(User, BookLoan.user_id == User.id)
         
         if status:
             query = query.filter(BookLoan.status == status)
         
         if search:
-            search_term = f"%{search.lower()}%"
-            query = query.filter(
-                or_(
-                    User.username.ilike(search_term),
-                    User.email.ilike(search_term),
-                    Book.title.ilike(search_term),
-                    Book.isbn.ilike(search_term)
-                )
-            )
+            query = query.filter(_loan_search_condition(search))
             
-        total = query.count()
-        
-        # Add eager loading for book and author relationships
+        if status or search:
+            total = query.count()
+        else:
+            total = LoanService.count_all_loans(db)
+        
+        # Book and User are already joined for filtering, so populate the relationships
+        # from those same columns instead of joinedload adding second aliased joins.
+        # Authors are a collection; a separate IN query keeps LIMIT applying to loans.
+        # Only the columns the list response renders are selected.
         query = query.options(
-            joinedload(BookLoan.book).joinedload(Book.authors),
-            joinedload(BookLoan.user)
+            load_only(
+                BookLoan.id, BookLoan.book_id, BookLoan.user_id, BookLoan.status,
+                BookLoan.loan_date, BookLoan.due_date, BookLoan.return_date,
+                BookLoan.renewal_count, BookLoan.fine_amount, BookLoan.notes,
+                BookLoan.created_at, BookLoan.updated_at
+            ),
+            contains_eager(BookLoan.book).load_only(Book.id, Book.title)
+            .selectinload(Book.authors).load_only(Author.id, Author.full_name, Author.nationality),
+            contains_eager(BookLoan.user).load_only(User.id, User.email)
         )
         
-        loans = query.order_by(desc(BookLoan.loan_date)).offset(skip).limit(limit).all()
+        query = query.order_by(desc(BookLoan.loan_date), desc(BookLoan.id))
+        if after:
+            query = query.filter(tuple_(BookLoan.loan_date, BookLoan.id) < tuple_(*after))
+        elif skip:
+            query = query.offset(skip)
+        
+        loans = query.limit(limit).all()
         
-        return total, loans
+        return total, BookLoan.precompute_due_state(loans)
     
     @staticmethod
     def update_overdue_status(db: Session) -> int:
         """Update status of overdue loans."""
-        overdue_loans = LoanService.get_overdue_loans(db)
-        
-        for loan in overdue_loans:
-            loan.status = LoanStatus.OVERDUE
-            # Calculate fine
-            days_overdue = (datetime.now() - loan.due_date).days
-            loan.fine_amount = Decimal(str(days_overdue * 1.00))  # $1 per day
+        now = datetime.now()
+        # Bulk UPDATE in LIMITed batches; the fine ($1 per full day overdue) is computed
+        # by MySQL per row. Updated rows leave the WHERE set, so each pass takes the next batch.
+        mark_overdue = (
+            update(BookLoan)
+            .where(
+                BookLoan.status.in_([LoanStatus.ACTIVE, LoanStatus.RENEWED]),
+                BookLoan.due_date < now
+            )
+            .values(
+                status=LoanStatus.OVERDUE,
+                fine_amount=func.timestampdiff(literal_column("DAY"), BookLoan.due_date, now)
+            )
+            .with_dialect_options(mysql_limit=SWEEP_BATCH_SIZE)
+            .execution_options(synchronize_session=False)
+        )
+        updated = 0
+        while True:
+            batch = db.execute(mark_overdue).rowcount
+            db.commit()
+            updated += batch
+            if batch < SWEEP_BATCH_SIZE:
+                break
         
-        db.commit()
-        logger.info(f"Updated {len(overdue_loans)} loans to overdue status")
-        return len(overdue_loans)
+        logger.info(f"Updated {updated} loans to overdue status")
+        return updated
     
     @staticmethod
     def get_loan_statistics(db: Session) -> LoanStatistics:
         """Get loan statistics."""
-        total_loans = db.query(BookLoan).count()
-        active_loans = db.query(BookLoan).filter(BookLoan.status == LoanStatus.ACTIVE).count()
-        overdue_loans = db.query(BookLoan).filter(BookLoan.status == LoanStatus.OVERDUE).count()
-        returned_loans = db.query(BookLoan).filter(BookLoan.status == LoanStatus.RETURNED).count()
-        
-        total_fines = db.query(BookLoan).filter(BookLoan.fine_amount > 0).with_entities(
-            db.func.sum(BookLoan.fine_amount)
-        ).scalar() or Decimal('0.00')
+        def count_where(condition):
+            return func.sum(case((condition, 1), else_=0))
+        
+        # One pass over book_loans; MySQL has no FILTER clause so use conditional sums
+        row = db.query(
+            func.count(BookLoan.id),
+            count_where(BookLoan.status == LoanStatus.ACTIVE),
+            count_where(BookLoan.status == LoanStatus.OVERDUE),
+            count_where(BookLoan.status == LoanStatus.RETURNED),
+            func.sum(case((BookLoan.fine_amount > 0, BookLoan.fine_amount), else_=0))
+        ).one()
+        total_loans, active_loans, overdue_loans, returned_loans = (int(value or 0) for value in row[:4])
+        total_fines = Decimal(row[4] or 0)
         
         return LoanStatistics(
             total_loans=total_loans,
@@ -244,17 +393,25 @@ class LoanService:
     @staticmethod
     def _fulfill_next_reservation(db: Session, book_id: int) -> Optional[BookReservation]:
         """Fulfill the next reservation in queue when a book becomes available."""
-        reservation = db.query(BookReservation).filter(
-            and_(
+        # Runs on every return; lambda_stmt reuses the built statement and rebinds book_id.
+        # The queue head is row-locked until commit; a concurrent return of another copy
+        # skips it and fulfills the next reservation instead of the same one twice.
+        reservation = db.execute(lambda_stmt(
+            lambda: select(BookReservation)
+            .where(
                 BookReservation.book_id == book_id,
                 BookReservation.status == ReservationStatus.PENDING
             )
-        ).order_by(asc(BookReservation.priority), asc(BookReservation.reservation_date)).first()
+            .order_by(asc(BookReservation.priority), asc(BookReservation.reservation_date))
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )).scalars().first()
         
         if reservation:
             reservation.status = ReservationStatus.FULFILLED
             reservation.notification_sent = True
             db.commit()
+            _availability_cache.pop(book_id)
             
             logger.info(f"Reservation fulfilled: {reservation.id}")
             return reservation
@@ -273,27 +430,27 @@ class ReservationService:
             raise ValueError("Book not found")
         
         # Check if user already has a reservation for this book
-        existing_reservation = db.query(BookReservation).filter(
-            and_(
+        has_pending_reservation = db.query(
+            exists().where(
                 BookReservation.book_id == reservation_data.book_id,
                 BookReservation.user_id == reservation_data.user_id,
                 BookReservation.status == ReservationStatus.PENDING
             )
-        ).first()
+        ).scalar()
         
-        if existing_reservation:
+        if has_pending_reservation:
             raise ValueError("User already has a pending reservation for this book")
         
         # Check if user already has an active loan for this book
-        active_loan = db.query(BookLoan).filter(
-            and_(
+        has_active_loan = db.query(
+            exists().where(
                 BookLoan.book_id == reservation_data.book_id,
                 BookLoan.user_id == reservation_data.user_id,
                 BookLoan.status.in_([LoanStatus.ACTIVE, LoanStatus.RENEWED])
             )
-        ).first()
+        ).scalar()
         
-        if active_loan:
+        if has_active_loan:
             raise ValueError("User already has this book on loan")
         
         # Create reservation
@@ -312,6 +469,7 @@ class ReservationService:
         db.add(reservation)
         db.commit()
         db.refresh(reservation)
+        _availability_cache.pop(reservation.book_id)
         
         logger.info(f"Reservation created: Book {reservation_data.book_id} for User {reservation_data.user_id}")
         return reservation
@@ -319,14 +477,18 @@ class ReservationService:
     @staticmethod
     def cancel_reservation(db: Session, reservation_id: int, user_id: Optional[int] = None) -> BookReservation:
         """Cancel a reservation."""
-        query = db.query(BookReservation).filter(BookReservation.id == reservation_id)
+        # Fetch the book in the same round-trip; its reserved count is adjusted below
+        query = db.query(BookReservation, Book).outerjoin(
+            Book, BookReservation.book_id == Book.id
+        ).filter(BookReservation.id == reservation_id)
         
         if user_id:
             query = query.filter(BookReservation.user_id == user_id)
         
-        reservation = query.first()
-        if not reservation:
+        row = query.first()
+        if not row:
             raise ValueError("Reservation not found")
+        reservation, book = row
         
         if reservation.status != ReservationStatus.PENDING:
             raise ValueError("Only pending reservations can be cancelled")
@@ -335,12 +497,12 @@ class ReservationService:
         reservation.status = ReservationStatus.CANCELLED
         
         # Update book reserved copies
-        book = db.query(Book).filter(Book.id == reservation.book_id).first()
         if book and book.reserved_copies > 0:
             book.reserved_copies -= 1
         
         db.commit()
         db.refresh(reservation)
+        _availability_cache.pop(reservation.book_id)
         
         logger.info(f"Reservation cancelled: {reservation_id}")
         return reservation
@@ -358,28 +520,66 @@ class ReservationService:
     @staticmethod
     def expire_old_reservations(db: Session) -> int:
         """Expire old reservations."""
-        expired_reservations = db.query(BookReservation).filter(
-            and_(
-                BookReservation.status == ReservationStatus.PENDING,
-                BookReservation.expiry_date < datetime.now()
-            )
-        ).all()
+        now = datetime.now()
+        is_expired = and_(
+            BookReservation.status == ReservationStatus.PENDING,
+            BookReservation.expiry_date < now
+        )
         
-        for reservation in expired_reservations:
-            reservation.status = ReservationStatus.EXPIRED
+        expired = 0
+        while True:
+            # Lock the next batch so a concurrent cancel can't release the same copy twice
+            batch_ids = db.execute(
+                select(BookReservation.id)
+                .where(is_expired)
+                .order_by(BookReservation.id)
+                .limit(SWEEP_BATCH_SIZE)
+                .with_for_update()
+            ).scalars().all()
+            if not batch_ids:
+                db.commit()
+                break
+            in_batch = BookReservation.id.in_(batch_ids)
             
-            # Update book reserved copies
-            book = db.query(Book).filter(Book.id == reservation.book_id).first()
-            if book and book.reserved_copies > 0:
-                book.reserved_copies -= 1
+            # Release the held copies per book in one multi-table UPDATE ...
+            expired_per_book = (
+                select(BookReservation.book_id, func.count().label("expired"))
+                .where(in_batch)
+                .group_by(BookReservation.book_id)
+                .subquery()
+            )
+            db.execute(
+                update(Book)
+                .where(Book.id == expired_per_book.c.book_id)
+                .values(reserved_copies=func.greatest(Book.reserved_copies - expired_per_book.c.expired, 0))
+                .execution_options(synchronize_session=False)
+            )
+            
+            # ... then flip the reservations themselves, in the same transaction
+            db.execute(
+                update(BookReservation)
+                .where(in_batch)
+                .values(status=ReservationStatus.EXPIRED)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            expired += len(batch_ids)
+            if len(batch_ids) < SWEEP_BATCH_SIZE:
+                break
         
-        db.commit()
-        logger.info(f"Expired {len(expired_reservations)} reservations")
-        return len(expired_reservations)
+        # Any number of books may have changed; expired entries are cheap to rebuild
+        _availability_cache.clear()
+        
+        logger.info(f"Expired {expired} reservations")
+        return expired
     
     @staticmethod
     def get_book_availability(db: Session, book_id: int) -> BookAvailabilityInfo:
-        """Get availability information for a book."""
+        """Get availability information for a book, cached per book for a short TTL."""
+        cached = _availability_cache.get(book_id)
+        if cached is not None:
+            return cached
+        
         book = db.query(Book).filter(Book.id == book_id).first()
         if not book:
             raise ValueError("Book not found")
@@ -414,7 +614,7 @@ class ReservationService:
             if earliest_due:
                 estimated_availability = earliest_due.due_date
         
-        return BookAvailabilityInfo(
+        availability = BookAvailabilityInfo(
             book_id=book_id,
             total_copies=book.total_copies,
             available_copies=book.available_copies,
@@ -424,3 +624,5 @@ class ReservationService:
             estimated_availability_date=estimated_availability,
             can_reserve=book.available_copies == 0 and pending_reservations < book.total_copies
         )
+        _availability_cache.set(book_id, availability)
+        return availability
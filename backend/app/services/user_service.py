@@ -1,11 +1,14 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
+from sqlalchemy import case, func, lambda_stmt, or_, select, update
 from fastapi import HTTPException, status
 from typing import List, Optional, Dict, Any
+from datetime import datetime
 from app.models.user import User, UserRole, UserStatus
 from app.schemas.user import UserRegistration, UserResponse, UserUpdate
-from app.utils.auth import hash_password, verify_password, create_tokens
+from app.utils.auth import hash_password, verify_password, create_tokens, invalidate_user_auth, invalidate_all_user_sessions
+from app.utils.cache import TTLCache
+from app.utils.log_queue import attach_queued_handlers
 import logging
 from logging.handlers import RotatingFileHandler
 import os
@@ -16,7 +19,8 @@ os.makedirs(access_log_dir, exist_ok=True)
 db_access_logger = logging.getLogger("DBAccessLogger")
 db_access_logger.setLevel(logging.INFO)
 if not db_access_logger.hasHandlers():
-    db_access_logger.addHandler(RotatingFileHandler(
+    # Login/registration log through a queue so requests never wait on the file write
+    attach_queued_handlers(db_access_logger, RotatingFileHandler(
         f"{access_log_dir}/db_access.log",
         maxBytes=10485760,  # 10MB
         backupCount=5
@@ -24,26 +28,38 @@ if not db_access_logger.hasHandlers():
 
 logger = logging.getLogger("BookLibraryAPI")
 
+# Dashboard statistics may lag by a few seconds; this keeps polling admin
+# pages from re-aggregating the users table on every request
+USER_STATS_TTL_SECONDS = 30
+_user_stats_cache = TTLCache(ttl=USER_STATS_TTL_SECONDS, maxsize=1)
+
+# Columns behind UserResponse (status feeds the permissions property); list
+# queries skip the password hash and login bookkeeping columns
+_LIST_COLUMNS = load_only(
+    User.id, User.email, User.username, User.first_name, User.last_name,
+    User.role, User.status, User.is_active, User.email_verified, User.created_at
+)
+
 class UserService:
     
     @staticmethod
     def create_user(db: Session, user_data: UserRegistration) -> User:
         """Create a new user with validation and password hashing"""
         try:
-            # Check if email already exists
-            existing_user_email = db.query(User).filter(User.email == user_data.email).first()
-            if existing_user_email:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email already registered"
-                )
-            
-            # Check if username already exists
-            existing_user_username = db.query(User).filter(User.username == user_data.username).first()
-            if existing_user_username:
+            # Check email and username uniqueness in one round-trip; at most two
+            # distinct rows can match (one per unique column)
+            conflicts = (
+                db.query(User.email, User.username)
+                .filter(or_(User.email == user_data.email, User.username == user_data.username))
+                .limit(2)
+                .all()
+            )
+            if conflicts:
+                # Unique indexes compare case-insensitively, so match the same way here
+                email_taken = any(row.email.lower() == user_data.email.lower() for row in conflicts)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Username already taken"
+                    detail="Email already registered" if email_taken else "Username already taken"
                 )
             
             # Hash the password
@@ -92,17 +108,20 @@ class UserService:
     @staticmethod
     def get_user_by_email(db: Session, email: str) -> User:
         """Get user by email"""
-        return db.query(User).filter(User.email == email).first()
+        # lambda_stmt caches the constructed statement; only the email is rebound per call
+        return db.execute(lambda_stmt(lambda: select(User).where(User.email == email))).scalars().first()
     
     @staticmethod
     def get_user_by_username(db: Session, username: str) -> User:
         """Get user by username"""
-        return db.query(User).filter(User.username == username).first()
+        return db.execute(lambda_stmt(lambda: select(User).where(User.username == username))).scalars().first()
     
     @staticmethod
     def get_user_by_id(db: Session, user_id: int) -> User:
         """Get user by ID"""
-        return db.query(User).filter(User.id == user_id).first()
+        # Primary-key lookup: served from the session's identity map when the
+        # row is already loaded, otherwise a direct PK SELECT
+        return db.get(User, user_id)
     
     @staticmethod
     def authenticate_user(db: Session, email: str, password: str) -> User:
@@ -129,14 +148,15 @@ class UserService:
                 detail="Invalid email or password"
             )
         
-        # Create tokens with session management
+        # Create tokens with session management; role is always a UserRole enum
+        role_value = user.role.value
         user_data = {
             "email": user.email,
-            "role": user.role.value if hasattr(user.role, 'value') else str(user.role),
+            "role": role_value,
             "user_id": user.id
         }
         
-        logger.info(f"Creating tokens for user: {user.email}, role: {user_data['role']}")
+        logger.info(f"Creating tokens for user: {user.email}, role: {role_value}")
         tokens = create_tokens(user_data)
         
         # Add user info to response
@@ -144,7 +164,7 @@ class UserService:
             "id": user.id,
             "email": user.email,
             "username": user.username,
-            "role": user.role.value if hasattr(user.role, 'value') else str(user.role),
+            "role": role_value,
             "first_name": user.first_name,
             "last_name": user.last_name
         }
@@ -166,6 +186,7 @@ class UserService:
         user.is_active = is_active
         db.commit()
         db.refresh(user)
+        invalidate_user_auth(user_id=user_id)
         
         logger.info(f"User {user.email} status updated to: {'active' if is_active else 'inactive'}")
         return user
@@ -197,33 +218,91 @@ class UserService:
     @staticmethod
     def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
         """Update user information"""
+        # Update only provided fields, mapping API enums onto the model's enums
+        update_data = user_update.model_dump(exclude_unset=True)
+        if update_data.get("role") is not None:
+            update_data["role"] = UserRole(update_data["role"].value)
+        if update_data.get("status") is not None:
+            update_data["status"] = UserStatus(update_data["status"].value)
+        
+        # One UPDATE without loading the row first (MySQL has no RETURNING)
+        if update_data and not UserService._update_columns(db, user_id, **update_data):
+            return None
+        
+        # The UPDATE synchronizes an already-loaded instance; otherwise this is one PK SELECT
         user = UserService.get_user_by_id(db, user_id)
         if not user:
             return None
         
-        # Update only provided fields
-        update_data = user_update.dict(exclude_unset=True)
-        
-        for field, value in update_data.items():
-            if hasattr(user, field):
-                setattr(user, field, value)
-        
-        db.commit()
-        db.refresh(user)
+        if "role" in update_data or "status" in update_data:
+            UserService._revoke_sessions(db, user_id, user.email)
         
         logger.info(f"User {user.email} updated: {list(update_data.keys())}")
         return user
     
+    @staticmethod
+    def _update_columns(db: Session, user_id: int, **values) -> bool:
+        """Issue a single UPDATE for one user; returns False if the user does not exist."""
+        result = db.execute(update(User).where(User.id == user_id).values(**values))
+        db.commit()
+        return result.rowcount > 0
+    
+    @staticmethod
+    def _revoke_sessions(db: Session, user_id: int, email: Optional[str] = None) -> None:
+        """
+        Terminate a user's sessions after a role/status change, so tokens
+        carrying the old role claim stop working immediately.
+        """
+        if email is None:
+            email = db.query(User.email).filter(User.id == user_id).scalar()
+        if email is not None:
+            invalidate_all_user_sessions(email)
+    
+    @staticmethod
+    def record_authenticated(db: Session, user_id: int, when: datetime) -> None:
+        """Stamp last_login and clear failed attempts with one UPDATE"""
+        UserService._update_columns(db, user_id, last_login=when, failed_login_attempts=0)
+    
+    @staticmethod
+    def set_status(db: Session, user_id: int, user_status, **values) -> bool:
+        """Set a user's account status without loading the row"""
+        updated = UserService._update_columns(db, user_id, status=UserStatus(user_status.value), **values)
+        if updated:
+            UserService._revoke_sessions(db, user_id)
+            logger.info(f"User {user_id} status set to: {user_status.value}")
+        return updated
+    
+    @staticmethod
+    def set_role(db: Session, user_id: int, role) -> bool:
+        """Set a user's role without loading the row"""
+        updated = UserService._update_columns(db, user_id, role=UserRole(role.value))
+        if updated:
+            UserService._revoke_sessions(db, user_id)
+            logger.info(f"User {user_id} role set to: {role.value}")
+        return updated
+    
+    @staticmethod
+    def update_profile_fields(db: Session, user_id: int, first_name: Optional[str], last_name: Optional[str]) -> bool:
+        """Update a user's own name fields with a single UPDATE"""
+        return UserService._update_columns(db, user_id, first_name=first_name, last_name=last_name)
+    
     @staticmethod
     def get_all_users(
         db: Session, 
         role: Optional[UserRole] = None,
         status: Optional[UserStatus] = None,
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        after_id: Optional[int] = None
     ) -> List[User]:
-        """Get all users with filtering and pagination"""
-        query = db.query(User)
+        """
+        Get all users with filtering and pagination.
+        
+        Pass ``after_id`` (the last id of the previous page) for keyset
+        pagination, which seeks on the primary key instead of scanning and
+        discarding ``skip`` rows.
+        """
+        query = db.query(User).options(_LIST_COLUMNS)
         
         if role:
             query = query.filter(User.role == role)
@@ -231,40 +310,48 @@ class UserService:
         if status:
             query = query.filter(User.status == status)
         
+        query = query.order_by(User.id)
+        if after_id is not None:
+            return query.filter(User.id > after_id).limit(limit).all()
+        
         return query.offset(skip).limit(limit).all()
     
     @staticmethod
     def get_user_statistics(db: Session) -> Dict[str, Any]:
         """Get user statistics for admin dashboard"""
-        total_users = db.query(User).count()
+        cached = _user_stats_cache.get("statistics")
+        if cached is not None:
+            return cached
         
-        # Count by role
-        role_counts = {}
-        for role in UserRole:
-            count = db.query(User).filter(User.role == role).count()
-            role_counts[role.value] = count
+        from datetime import datetime, timedelta
+        thirty_days_ago = datetime.now() - timedelta(days=30)
         
-        # Count by status
-        status_counts = {}
-        for status in UserStatus:
-            count = db.query(User).filter(User.status == status).count()
-            status_counts[status.value] = count
+        def count_where(condition):
+            return func.sum(case((condition, 1), else_=0))
         
-        # Active users
-        active_users = db.query(User).filter(User.is_active == True).count()
+        # One pass over users with conditional sums (MySQL has no FILTER clause)
+        row = db.query(
+            func.count(User.id),
+            count_where(User.is_active == True),
+            count_where(User.created_at >= thirty_days_ago),
+            *[count_where(User.role == role) for role in UserRole],
+            *[count_where(User.status == status) for status in UserStatus]
+        ).one()
+        counts = [int(value or 0) for value in row]
         
-        # Recent registrations (last 30 days)
-        from datetime import datetime, timedelta
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        recent_registrations = db.query(User).filter(User.created_at >= thirty_days_ago).count()
+        total_users, active_users, recent_registrations = counts[:3]
+        role_counts = dict(zip((role.value for role in UserRole), counts[3:3 + len(UserRole)]))
+        status_counts = dict(zip((status.value for status in UserStatus), counts[3 + len(UserRole):]))
         
-        return {
+        stats = {
             "total_users": total_users,
             "active_users": active_users,
             "role_distribution": role_counts,
             "status_distribution": status_counts,
             "recent_registrations": recent_registrations
         }
+        _user_stats_cache.set("statistics", stats)
+        return stats
     
     @staticmethod
     def increment_failed_login(db: Session, email: str) -> None:
@@ -279,6 +366,7 @@ class UserService:
                 logger.warning(f"User {email} suspended due to excessive failed login attempts")
             
             db.commit()
+            invalidate_user_auth(email=email)
     
     @staticmethod
     def reset_failed_login_attempts(db: Session, user_id: int) -> None:
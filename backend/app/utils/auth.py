@@ -4,8 +4,11 @@ from typing import Optional, Dict, Any
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from app.config import settings
+from app.utils.cache import TTLCache
+import hashlib
 import logging
 import secrets
+import time
 
 logger = logging.getLogger("BookLibraryAPI")
 
@@ -20,6 +23,35 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7
 # Active sessions storage (in production, use Redis or database)
 active_sessions: Dict[str, Dict[str, Any]] = {}
 
+# Authenticated user snapshots (role, permissions, status) keyed by email, so
+# protected endpoints skip the per-request user lookup. Entries are dropped
+# whenever an account's role or status changes.
+AUTH_CACHE_TTL_SECONDS = 60
+user_auth_cache = TTLCache(ttl=AUTH_CACHE_TTL_SECONDS, maxsize=4096)
+
+# Decoded claims of recently verified tokens keyed by the token's digest, so a
+# client sending the same bearer token repeatedly skips the HMAC check and JSON
+# decode. Session state is still checked on every call; only valid tokens are cached.
+TOKEN_CACHE_TTL_SECONDS = 5
+_decoded_token_cache = TTLCache(ttl=TOKEN_CACHE_TTL_SECONDS, maxsize=10000)
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    """jwt.decode with a short-lived cache; cached claims are never used past their exp."""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _decoded_token_cache.get(key)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    _decoded_token_cache.set(key, payload)
+    return payload
+
+def invalidate_user_auth(user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+    """Drop a user's cached auth snapshot after their account changes."""
+    if email is not None:
+        user_auth_cache.pop(email)
+    if user_id is not None:
+        user_auth_cache.discard_where(lambda user: user.id == user_id)
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     return pwd_context.hash(password)
@@ -59,6 +91,7 @@ def create_tokens(user_data: dict) -> dict:
     
     token_data = {
         "sub": user_data["email"],
+        "uid": user_data.get("user_id"),  # lets the auth dependency load the user by primary key
         "role": user_data["role"],
         "session_id": session_id
     }
@@ -67,11 +100,12 @@ def create_tokens(user_data: dict) -> dict:
     refresh_token = create_refresh_token(token_data)
     
     # Store session info
+    now = datetime.utcnow()
     active_sessions[session_id] = {
         "user_email": user_data["email"],
         "user_role": user_data["role"],
-        "created_at": datetime.utcnow(),
-        "last_accessed": datetime.utcnow(),
+        "created_at": now,
+        "last_accessed": now,
         "is_active": True
     }
     
@@ -83,13 +117,14 @@ def create_tokens(user_data: dict) -> dict:
         "session_id": session_id
     }
     
-    logger.debug(f"Created tokens for {user_data['email']}: access_token length={len(access_token)}")
+    logger.debug("Created tokens for %s: access_token length=%d", user_data['email'], len(access_token))
     return tokens_response
 
 def verify_token(token: str, token_type: str = "access"):
     """Verify and decode a JWT token with session validation"""
     try:
-        logger.debug(f"Verifying token: {token[:20]}... (type: {token_type})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Verifying token: %s... (type: %s)", token[:20], token_type)
         
         if not token or len(token.split('.')) != 3:
             logger.warning(f"Invalid token format: token has {len(token.split('.')) if token else 0} segments")
@@ -99,7 +134,7 @@ def verify_token(token: str, token_type: str = "access"):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        payload = _decode_token(token)
         email: str = payload.get("sub")
         role: str = payload.get("role")
         session_id: str = payload.get("session_id")
@@ -143,9 +178,10 @@ def verify_token(token: str, token_type: str = "access"):
                 "last_accessed": datetime.utcnow()
             }
         
-        logger.debug(f"Token verified successfully for user: {email}")
+        logger.debug("Token verified successfully for user: %s", email)
         return {
             "email": email,
+            "user_id": payload.get("uid"),  # None for tokens issued before the claim existed
             "role": role,
             "session_id": session_id
         }
@@ -166,6 +202,7 @@ def refresh_access_token(refresh_token: str) -> dict:
         # Create new access token
         token_data = {
             "sub": payload["email"],
+            "uid": payload["user_id"],
             "role": payload["role"],
             "session_id": payload["session_id"]
         }
@@ -234,28 +271,12 @@ def cleanup_expired_sessions():
 
 def validate_password_strength(password: str) -> bool:
     """Validate password meets strength requirements"""
-    import re
-    
-    # Check minimum length
-    if len(password) < 8:
-        return False
-    
-    # Check for uppercase letter
-    if not re.search(r'[A-Z]', password):
-        return False
-    
-    # Check for lowercase letter
-    if not re.search(r'[a-z]', password):
-        return False
+    from app.schemas.user import check_password_strength
     
-    # Check for digit
-    if not re.search(r'\d', password):
-        return False
-    
-    # Check for special character
-    if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+    try:
+        check_password_strength(password)
+    except ValueError:
         return False
-    
     return True
 
 def get_password_strength_requirements() -> dict:
@@ -0,0 +1,104 @@
+"""
+Small in-process caching helpers.
+"""
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def _make_key(args: tuple, kwargs: dict) -> Hashable:
+    if not kwargs:
+        return args
+    return args + (object,) + tuple(sorted(kwargs.items()))
+
+
+def ttl_cache(ttl: float, maxsize: int = 128):
+    """
+    Memoize a function's results for ``ttl`` seconds.
+
+    Like ``functools.lru_cache`` the wrapped function exposes ``cache_clear()``
+    so writers can invalidate cached reads explicitly.
+    """
+    def decorator(func: Callable) -> Callable:
+        entries: Dict[Hashable, Tuple[float, Any]] = {}
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            now = time.monotonic()
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and entry[0] > now:
+                    return entry[1]
+
+            value = func(*args, **kwargs)
+
+            with lock:
+                if len(entries) >= maxsize and key not in entries:
+                    # Drop expired entries first, then the oldest one if still full
+                    for stale_key in [k for k, (expires, _) in entries.items() if expires <= now]:
+                        del entries[stale_key]
+                    if len(entries) >= maxsize:
+                        del entries[next(iter(entries))]
+                entries[key] = (now + ttl, value)
+            return value
+
+        def cache_clear() -> None:
+            with lock:
+                entries.clear()
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
+
+
+class TTLCache:
+    """
+    Thread-safe mapping whose entries expire ``ttl`` seconds after being set.
+
+    Used where callers need targeted invalidation rather than ``cache_clear()``.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.maxsize and key not in self._entries:
+                for stale_key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                    del self._entries[stale_key]
+                if len(self._entries) >= self.maxsize:
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + self.ttl, value)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> None:
+        """Drop every entry whose value matches ``predicate``."""
+        with self._lock:
+            for key in [k for k, (_, value) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
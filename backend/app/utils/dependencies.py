@@ -1,8 +1,10 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPBearer
 from typing import Optional
 from sqlalchemy.orm import Session
-from app.utils.auth import verify_token
+from app.utils.auth import verify_token, user_auth_cache
+from app.utils.cache import TTLCache
 from app.services.user_service import UserService
 from app.database import get_db
 from app.schemas.user import UserResponse, UserRole, UserStatus
@@ -11,21 +13,19 @@ from datetime import datetime
 
 logger = logging.getLogger("BookLibraryAPI")
 
-# Security scheme
-security = HTTPBearer()
-
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> UserResponse:
+class BearerToken(HTTPBearer):
     """
-    Dependency to get current authenticated user
+    HTTPBearer that returns the raw token string.
+    
+    Parses the Authorization header directly instead of building an
+    HTTPAuthorizationCredentials model per request; subclassing keeps the
+    bearer scheme in the OpenAPI docs.
     """
-    try:
-        logger.debug(f"Received credentials: {credentials.scheme if credentials else 'None'}")
-        logger.debug(f"Token received: '{credentials.credentials[:50] if credentials and credentials.credentials else 'None'}...'")
-        
-        if not credentials:
+    async def __call__(self, request: Request) -> Optional[str]:
+        authorization = request.headers.get("Authorization")
+        if not authorization:
+            if not self.auto_error:
+                return None
             logger.warning("No credentials provided")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -33,66 +33,113 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        if not credentials.credentials:
-            logger.warning("Empty token in credentials")
+        scheme, _, token = authorization.partition(" ")
+        token = token.strip()
+        if scheme.lower() != "bearer" or not token:
+            if not self.auto_error:
+                return None
+            logger.warning("Empty or non-bearer token in Authorization header")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token missing in Authorization header",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        
-        # Verify token and get user data
-        token_data = verify_token(credentials.credentials)
-        
-        # Get user from database
+        return token
+
+# Security scheme
+security = BearerToken(scheme_name="HTTPBearer")
+optional_security = BearerToken(scheme_name="HTTPBearer", auto_error=False)
+
+# Role sets for the guards below, built once instead of a list literal per request
+_ADMIN_ROLES = frozenset({UserRole.ADMIN})
+_LIBRARIAN_ROLES = frozenset({UserRole.ADMIN, UserRole.LIBRARIAN})
+_MEMBER_ROLES = frozenset({UserRole.ADMIN, UserRole.LIBRARIAN, UserRole.MEMBER})
+
+LAST_LOGIN_WRITE_INTERVAL_SECONDS = 60
+_last_login_written = TTLCache(ttl=LAST_LOGIN_WRITE_INTERVAL_SECONDS, maxsize=10000)
+
+def _load_user_response(db: Session, token_data: dict) -> UserResponse:
+    """Load, check and cache the user behind verified ``token_data``."""
+    # Get user from database: primary key when the token carries it, email for older tokens
+    if token_data["user_id"] is not None:
+        user = UserService.get_user_by_id(db, token_data["user_id"])
+    else:
         user = UserService.get_user_by_email(db, token_data["email"])
+    
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User account is inactive",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Check user status; the model's enum is compared by value with the API enum
+    account_status = user.status.value
+    if account_status == UserStatus.SUSPENDED:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account is suspended",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if account_status == UserStatus.DELETED:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Account no longer exists",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Update last login at most once per LAST_LOGIN_WRITE_INTERVAL_SECONDS per user;
+    # auth-cache invalidations (role/status changes) don't force an extra write
+    if _last_login_written.get(user.id) is None:
+        UserService.record_authenticated(db, user.id, datetime.now())
+        _last_login_written.set(user.id, True)
+    
+    # Add session info to user object
+    user.current_session_id = token_data.get("session_id")
+    
+    # Convert to UserResponse; permissions come from the model's permissions property
+    user_response = UserResponse.model_validate(user)
+    user_auth_cache.set(token_data["email"], user_response)
+    return user_response
+
+async def get_current_user(
+    token: str = Depends(security),
+    db: Session = Depends(get_db)
+) -> UserResponse:
+    """
+    Dependency to get current authenticated user
+    """
+    try:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Token received: '%s...'", token[:50])
         
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User account is inactive",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Check user status
-        if hasattr(user, 'status') and user.status == UserStatus.SUSPENDED:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Account is suspended",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        if hasattr(user, 'status') and user.status == UserStatus.DELETED:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Account no longer exists",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Update last login
-        if hasattr(user, 'last_login'):
-            user.last_login = datetime.now()
-            user.failed_login_attempts = 0  # Reset on successful auth
-            db.commit()
+        # Verify token and get user data
+        token_data = verify_token(token)
         
-        # Add session info to user object
-        user.current_session_id = token_data.get("session_id")
+        # Users authenticated within the last AUTH_CACHE_TTL_SECONDS are served
+        # from the auth cache; last_login is therefore refreshed on cache misses
+        cached_user = user_auth_cache.get(token_data["email"])
+        if cached_user is not None:
+            session_id = token_data.get("session_id")
+            # Snapshots are treated as read-only, so the same session reuses it as-is
+            if cached_user.current_session_id == session_id:
+                return cached_user
+            return cached_user.model_copy(update={"current_session_id": session_id})
         
-        # Convert to UserResponse with permissions
-        user_response = UserResponse.from_orm(user)
-        if hasattr(user, 'get_permissions'):
-            user_response.permissions = user.get_permissions()
+        # Cache miss: the blocking DB lookup runs in the threadpool, not on the event loop
+        user_response = await run_in_threadpool(_load_user_response, db, token_data)
         
         # Log successful authorization with user details
-        logger.info(f"🔐 AUTHORIZATION SUCCESS: User '{user_response.email}' (Role: {user_response.role}) authenticated successfully!")
-        logger.debug(f"Authentication successful for user: {user_response.email}")
+        logger.info("🔐 AUTHORIZATION SUCCESS: User '%s' (Role: %s) authenticated successfully!", user_response.email, user_response.role)
+        logger.debug("Authentication successful for user: %s", user_response.email)
         return user_response
         
     except HTTPException:
@@ -105,6 +152,14 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+async def get_token_data(
+    token: str = Depends(security)
+) -> dict:
+    """
+    Dependency returning verified JWT claims (email, role, session_id) without a DB lookup
+    """
+    return verify_token(token)
+
 async def get_current_active_user(
     current_user: UserResponse = Depends(get_current_user)
 ) -> UserResponse:
@@ -119,7 +174,7 @@ async def get_admin_user(
     """
     Dependency to ensure current user is an admin
     """
-    if current_user.role != UserRole.ADMIN:
+    if current_user.role not in _ADMIN_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
@@ -132,7 +187,7 @@ async def get_librarian_user(
     """
     Dependency to ensure current user is a librarian or admin
     """
-    if current_user.role not in [UserRole.ADMIN, UserRole.LIBRARIAN]:
+    if current_user.role not in _LIBRARIAN_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Librarian or Admin access required"
@@ -145,7 +200,7 @@ async def get_member_user(
     """
     Dependency to ensure current user is at least a member
     """
-    if current_user.role not in [UserRole.ADMIN, UserRole.LIBRARIAN, UserRole.MEMBER]:
+    if current_user.role not in _MEMBER_ROLES:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Member access or higher required"
@@ -153,17 +208,17 @@ async def get_member_user(
     return current_user
 
 async def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    token: Optional[str] = Depends(optional_security),
     db: Session = Depends(get_db)
 ) -> Optional[UserResponse]:
     """
     Dependency for optional authentication (returns None if no token)
     """
-    if credentials is None:
+    if token is None:
         return None
     
     try:
-        return await get_current_user(credentials, db)
+        return await get_current_user(token, db)
     except HTTPException:
         return None
 
@@ -173,10 +228,11 @@ class RequireRole:
     """
     def __init__(self, required_roles: list):
         self.required_roles = required_roles
+        self._allowed_roles = frozenset(required_roles)
     
-    def __call__(self, current_user: UserResponse = Depends(get_current_user)):
-        if current_user.role not in self.required_roles:
-            role_names = [role.value if hasattr(role, 'value') else str(role) for role in self.required_roles]
+    async def __call__(self, current_user: UserResponse = Depends(get_current_user)):
+        if current_user.role not in self._allowed_roles:
+            role_names = [getattr(role, 'value', role) for role in self.required_roles]
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access denied. Required roles: {', '.join(role_names)}"
@@ -190,8 +246,8 @@ class RequirePermission:
     def __init__(self, required_permission: str):
         self.required_permission = required_permission
     
-    def __call__(self, current_user: UserResponse = Depends(get_current_user)):
-        if self.required_permission not in current_user.permissions:
+    async def __call__(self, current_user: UserResponse = Depends(get_current_user)):
+        if self.required_permission not in (current_user.permissions or ()):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Access denied. Required permission: {self.required_permission}"
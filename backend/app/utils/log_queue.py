@@ -0,0 +1,62 @@
+"""
+Non-blocking log handler wiring.
+"""
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import List
+
+import orjson
+
+# Listeners draining queued records into the real (blocking) handlers
+_log_listeners: List[QueueListener] = []
+
+
+# QueueHandler.prepare() merges the traceback into the message and clears exc_info
+_TRACEBACK_MARKER = "\nTraceback (most recent call last):"
+
+
+class JSONFormatter(logging.Formatter):
+    """Format each record as one JSON object per line, serialized with orjson."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info:
+            exc = self.formatException(record.exc_info)
+        else:
+            message, marker, rest = message.partition(_TRACEBACK_MARKER)
+            exc = marker.lstrip("\n") + rest if marker else None
+        payload = {
+            "ts": self.formatTime(record),
+            "lvl": record.levelname,
+            "logger": record.name,
+            "msg": message,
+        }
+        if exc:
+            payload["exc"] = exc
+        return orjson.dumps(payload).decode()
+
+
+def attach_queued_handlers(logger: logging.Logger, *handlers: logging.Handler) -> QueueListener:
+    """
+    Attach ``handlers`` to ``logger`` behind a QueueHandler.
+
+    The calling thread only enqueues the record; formatting and file/stream
+    I/O happen on the listener's background thread.
+    """
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _log_listeners.append(listener)
+    return listener
+
+
+def stop_log_listeners() -> None:
+    """Flush queued records and stop every listener; safe to call more than once."""
+    while _log_listeners:
+        _log_listeners.pop().stop()
+
+
+atexit.register(stop_log_listeners)
@@ -4,6 +4,7 @@ from logging.handlers import RotatingFileHandler
 import datetime
 import os
 from app.config import settings
+from app.utils.log_queue import JSONFormatter, attach_queued_handlers
 
 def setup_logger():
     # Create logs directory if it doesn't exist
@@ -17,15 +18,18 @@ def setup_logger():
     formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     file_handler = RotatingFileHandler(
         f"{log_dir}/app_{datetime.datetime.now().strftime('%Y%m%d')}.log",
-        maxBytes=10485760,  # 10MB
-        backupCount=5
+        maxBytes=52428800,  # 50MB; fewer rollovers under heavy logging
+        backupCount=5,
+        delay=True  # don't open the file until the first record is written
     )
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    # Structured lines for the file; the console keeps the human-readable format
+    file_handler.setFormatter(JSONFormatter())
 
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+
+    # Request threads only enqueue records; file and console I/O run on the listener thread
+    attach_queued_handlers(logger, file_handler, console_handler)
 
     return logger
 
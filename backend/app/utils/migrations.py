@@ -5,6 +5,8 @@ import os
 import sys
 import subprocess
 import shutil
+from contextlib import contextmanager
+from functools import lru_cache
 from typing import List, Optional
 from pathlib import Path
 import logging
@@ -12,21 +14,92 @@ from alembic.config import Config
 from alembic import command
 from alembic.runtime.migration import MigrationContext
 from alembic.script import ScriptDirectory
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
 from app.config import settings
+from app.core.db import engine as shared_engine
+from app.utils.cache import ttl_cache
 
 logger = logging.getLogger(__name__)
 
+# Status pollers (dashboards, health checks) share one DB lookup per window
+MIGRATION_STATUS_TTL_SECONDS = 3
+
+# Cross-process lock guarding schema changes (named lock on MySQL, advisory lock on Postgres)
+MIGRATION_LOCK_NAME = "book_library_migrations"
+MIGRATION_LOCK_ID = 0xA17BA51C
+
+
+class MigrationError(Exception):
+    """Raised when a migration operation fails."""
+
+
+class MigrationInProgressError(MigrationError):
+    """Raised when another process is already changing the schema."""
+
+
+@lru_cache(maxsize=1)
+def _load_head_revision(alembic_cfg_path: str) -> Optional[str]:
+    """Parse the Alembic scripts directory once and remember the head revision."""
+    script = ScriptDirectory.from_config(Config(alembic_cfg_path))
+    return script.get_current_head()
+
+
+def clear_head_revision_cache() -> None:
+    """Forget the memoized head revision (e.g. after a new migration is generated)."""
+    _load_head_revision.cache_clear()
+
+
 class MigrationManager:
     """
     Comprehensive migration management system with Alembic integration.
     """
     
-    def __init__(self):
+    def __init__(self, engine: Optional[Engine] = None):
         self.project_root = Path(__file__).parent.parent.parent
         self.alembic_cfg_path = self.project_root / "alembic.ini"
         self.config = Config(str(self.alembic_cfg_path))
-        self.engine = create_engine(settings.DATABASE_URL)
+        # Reuse the application's pooled engine instead of opening a new pool per manager
+        self.engine = engine if engine is not None else shared_engine
+        
+    @contextmanager
+    def migration_lock(self):
+        """Hold an exclusive, non-blocking lock for the duration of a schema change."""
+        dialect = self.engine.dialect.name
+        if dialect == "mysql":
+            with self.engine.connect() as connection:
+                acquired = connection.execute(
+                    text("SELECT GET_LOCK(:name, 0)"), {"name": MIGRATION_LOCK_NAME}
+                ).scalar()
+                if acquired != 1:
+                    raise MigrationInProgressError("Migration already in progress")
+                try:
+                    yield
+                finally:
+                    connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+        elif dialect == "postgresql":
+            with self.engine.connect() as connection:
+                acquired = connection.execute(
+                    text("SELECT pg_try_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID}
+                ).scalar()
+                if not acquired:
+                    raise MigrationInProgressError("Migration already in progress")
+                try:
+                    yield
+                finally:
+                    connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+        else:
+            import fcntl
+            lock_path = self.project_root / ".migration.lock"
+            with open(lock_path, "w") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise MigrationInProgressError("Migration already in progress")
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
         
     def get_current_revision(self) -> Optional[str]:
         """Get the current database revision."""
@@ -41,8 +114,9 @@ class MigrationManager:
     def get_head_revision(self) -> Optional[str]:
         """Get the latest migration revision."""
         try:
-            script = ScriptDirectory.from_config(self.config)
-            return script.get_current_head()
+            # The scripts directory only changes when a migration is created,
+            # so the head is memoized per process instead of re-parsed per call.
+            return _load_head_revision(str(self.alembic_cfg_path))
         except Exception as e:
             logger.error(f"Error getting head revision: {e}")
             return None
@@ -52,21 +126,23 @@ class MigrationManager:
         try:
             current = self.get_current_revision()
             script = ScriptDirectory.from_config(self.config)
-            
-            if current is None:
-                # No migrations applied yet, return all migrations
-                return [rev.revision for rev in script.walk_revisions()]
-            
-            pending = []
-            for rev in script.walk_revisions("head", current):
-                if rev.revision != current:
-                    pending.append(rev.revision)
-            
-            return pending
+            return self._pending_revisions(script, current)
         except Exception as e:
             logger.error(f"Error getting pending migrations: {e}")
             return []
     
+    @staticmethod
+    def _pending_revisions(script: ScriptDirectory, current: Optional[str]) -> List[str]:
+        """Revisions between the given current revision and head."""
+        if current is None:
+            # No migrations applied yet, return all migrations
+            return [rev.revision for rev in script.walk_revisions()]
+        
+        return [
+            rev.revision for rev in script.walk_revisions("head", current)
+            if rev.revision != current
+        ]
+    
     def create_migration(self, message: str, autogenerate: bool = True) -> str:
         """Create a new migration."""
         try:
@@ -75,11 +151,12 @@ class MigrationManager:
             else:
                 command.revision(self.config, message=message)
             
+            clear_head_revision_cache()
             logger.info(f"Created migration: {message}")
             return self.get_head_revision()
         except Exception as e:
             logger.error(f"Error creating migration: {e}")
-            raise
+            raise MigrationError(str(e)) from e
     
     def upgrade_database(self, revision: str = "head") -> bool:
         """Upgrade database to specified revision."""
@@ -132,9 +209,12 @@ class MigrationManager:
     def check_migration_status(self) -> dict:
         """Check the current migration status."""
         try:
+            # Read alembic_version once (one connection) and derive the rest
+            # from the scripts directory instead of re-querying per value
             current = self.get_current_revision()
             head = self.get_head_revision()
-            pending = self.get_pending_migrations()
+            script = ScriptDirectory.from_config(self.config)
+            pending = self._pending_revisions(script, current)
             
             return {
                 "current_revision": current,
@@ -154,7 +234,7 @@ class MigrationManager:
                 "error": str(e)
             }
     
-    def backup_database(self, backup_path: Optional[str] = None) -> str:
+    def backup_database(self, backup_path: Optional[str] = None, buffer_size: Optional[int] = None) -> str:
         """Create a database backup before migration."""
         try:
             # Check if mysqldump is available (not available in Railway containers)
@@ -181,6 +261,9 @@ class MigrationManager:
                 f"--host={parsed.hostname}",
                 f"--port={parsed.port or 3306}",
                 f"--user={parsed.username}",
+                # Chunk size of the extended INSERTs written to the dump; larger
+                # chunks mean fewer statements/round-trips when it is restored
+                f"--net-buffer-length={buffer_size or settings.BACKUP_BUFFER_BYTES}",
                 parsed.path.lstrip('/'),  # database name
                 f"--result-file={backup_path}"
             ]
@@ -195,11 +278,13 @@ class MigrationManager:
                 return backup_path
             else:
                 logger.error(f"Backup failed: {result.stderr}")
-                raise Exception(f"Backup failed: {result.stderr}")
+                raise MigrationError(f"Backup failed: {result.stderr}")
                 
+        except MigrationError:
+            raise
         except Exception as e:
             logger.error(f"Error creating backup: {e}")
-            raise
+            raise MigrationError(str(e)) from e
     
     def restore_database(self, backup_path: str) -> bool:
         """Restore database from backup."""
@@ -232,11 +317,29 @@ class MigrationManager:
             logger.error(f"Error restoring database: {e}")
             return False
     
+    def _resolve_revision(self, revision: str) -> None:
+        """Raise if the revision cannot be resolved in the scripts directory."""
+        script = ScriptDirectory.from_config(self.config)
+        script.get_revisions(revision)
+    
     def safe_migrate(self, target_revision: str = "head", create_backup: bool = True) -> dict:
         """Safely migrate database with backup and rollback capabilities."""
         backup_path = None
         original_revision = self.get_current_revision()
         
+        try:
+            # Reject an unknown target before spending time on the dump
+            self._resolve_revision(target_revision)
+        except Exception as e:
+            logger.error(f"Migration preparation failed: {e}")
+            return {
+                "success": False,
+                "message": f"Migration failed: {e}",
+                "backup_path": backup_path,
+                "original_revision": original_revision,
+                "rollback_attempted": False
+            }
+        
         try:
             # Create backup if requested
             if create_backup:
@@ -285,3 +388,20 @@ class MigrationManager:
                 "original_revision": original_revision,
                 "rollback_attempted": False
             }
+
+
+@lru_cache(maxsize=1)
+def get_migration_manager() -> MigrationManager:
+    """Process-wide MigrationManager bound to the shared engine."""
+    return MigrationManager()
+
+
+@ttl_cache(ttl=MIGRATION_STATUS_TTL_SECONDS, maxsize=1)
+def get_cached_migration_status() -> dict:
+    """Migration status memoized for a few seconds to absorb polling loops."""
+    return get_migration_manager().check_migration_status()
+
+
+def clear_migration_status_cache() -> None:
+    """Forget the memoized migration status after the schema has changed."""
+    get_cached_migration_status.cache_clear()
@@ -1,18 +1,26 @@
 """
 Role-Based Access Control (RBAC) dependencies and decorators.
 """
+import inspect
 from functools import wraps
 from typing import List, Optional, Union, Callable, Any
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.utils.dependencies import get_current_user, get_db
-from app.models.user import User, UserStatus
 from app.schemas.user import UserResponse, UserRole
+from app.config import settings
 import logging
 
 logger = logging.getLogger("RBAC")
-security = HTTPBearer()
+
+# Permissions granted per role, built once so checks are O(1) set lookups
+_NO_PERMISSIONS: frozenset = frozenset()
+_ROLE_PERMISSIONS = {
+    UserRole.ADMIN: frozenset({'admin', 'manage_books', 'manage_authors', 'manage_users', 'admin_panel'}),
+    UserRole.LIBRARIAN: frozenset({'librarian', 'manage_books', 'manage_authors', 'admin_panel'}),
+    UserRole.MEMBER: frozenset({'create_review', 'vote_reviews', 'borrow_books'}),
+    UserRole.GUEST: _NO_PERMISSIONS,
+}
 
 # RBAC Exceptions
 class InsufficientPermissionsError(HTTPException):
@@ -39,89 +47,75 @@ class EmailNotVerifiedError(HTTPException):
             detail="Email verification required to access this resource."
         )
 
-# Permission Dependency Functions
-async def require_active_user(
-    current_user: UserResponse = Depends(get_current_user)
-) -> UserResponse:
-    """Require user to be active and not suspended."""
+# Local development databases skip the email verification requirement
+_SKIP_EMAIL_VERIFICATION = "localhost" in settings.DATABASE_URL or "127.0.0.1" in settings.DATABASE_URL
+
+def _ensure_active(current_user: UserResponse) -> None:
+    # Suspended/deleted accounts are already rejected by get_current_user;
+    # UserResponse carries only the is_active flag
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Account is inactive"
         )
-    
-    if hasattr(current_user, 'status') and current_user.status != UserStatus.ACTIVE:
-        raise AccountSuspendedError()
-    
-    return current_user
 
-async def require_verified_user(
-    current_user: UserResponse = Depends(require_active_user)
-) -> UserResponse:
-    """Require user to have verified email, except for admin users."""
+def _ensure_verified(current_user: UserResponse) -> None:
     # Admin users can bypass email verification requirement
-    if hasattr(current_user, 'role') and current_user.role == UserRole.ADMIN:
-        return current_user
+    if current_user.role == UserRole.ADMIN or _SKIP_EMAIL_VERIFICATION:
+        return
     
-    # For local development, bypass email verification check
-    # Check if we're in local development (localhost database)
-    try:
-        from app.config import settings
-        if "localhost" in settings.DATABASE_URL or "127.0.0.1" in settings.DATABASE_URL:
-            logger.info(f"Local development mode: bypassing email verification for {current_user.email}")
-            return current_user
-    except Exception as e:
-        logger.warning(f"Could not check development mode: {e}")
-    
-    if not getattr(current_user, 'email_verified', True):
+    if not current_user.email_verified:
         raise EmailNotVerifiedError()
-    
-    return current_user
 
-async def require_admin_user(
-    current_user: UserResponse = Depends(require_verified_user)
+# Permission Dependency Functions
+async def require_active_user(
+    current_user: UserResponse = Depends(get_current_user)
 ) -> UserResponse:
-    """Require user to have admin privileges."""
-    if not hasattr(current_user, 'role') or current_user.role != UserRole.ADMIN:
-        raise InsufficientPermissionsError("admin", getattr(current_user, 'role', 'unknown'))
-    
-    logger.info(f"Admin access granted to user {current_user.email}")
+    """Require user to be active and not suspended."""
+    _ensure_active(current_user)
     return current_user
 
-async def require_librarian_user(
-    current_user: UserResponse = Depends(require_verified_user)
+async def require_verified_user(
+    current_user: UserResponse = Depends(get_current_user)
 ) -> UserResponse:
-    """Require user to have librarian or admin privileges."""
-    if not hasattr(current_user, 'role') or current_user.role not in [UserRole.ADMIN, UserRole.LIBRARIAN]:
-        raise InsufficientPermissionsError("librarian or admin", getattr(current_user, 'role', 'unknown'))
-    
-    logger.info(f"Librarian access granted to user {current_user.email}")
+    """Require an active user with verified email, except for admin users."""
+    _ensure_active(current_user)
+    _ensure_verified(current_user)
     return current_user
 
-async def require_member_user(
-    current_user: UserResponse = Depends(require_verified_user)
-) -> UserResponse:
-    """Require user to have member privileges or higher."""
-    if not hasattr(current_user, 'role') or current_user.role not in [UserRole.ADMIN, UserRole.LIBRARIAN, UserRole.MEMBER]:
-        raise InsufficientPermissionsError("member or higher", getattr(current_user, 'role', 'unknown'))
+def make_role_guard(
+    allowed_roles: List[UserRole],
+    required_label: Optional[str] = None,
+    require_verified: bool = True
+) -> Callable:
+    """
+    Create one dependency that runs the active, email-verified and role checks
+    inline, instead of chaining a separate dependency for each step.
+    """
+    allowed = frozenset(allowed_roles)
+    label = required_label or f"one of: {', '.join(role.value for role in allowed_roles)}"
     
-    return current_user
+    async def guard(
+        current_user: UserResponse = Depends(get_current_user)
+    ) -> UserResponse:
+        _ensure_active(current_user)
+        if require_verified:
+            _ensure_verified(current_user)
+        if current_user.role not in allowed:
+            raise InsufficientPermissionsError(label, current_user.role)
+        return current_user
+    
+    return guard
+
+require_admin_user = make_role_guard([UserRole.ADMIN], "admin")
+require_librarian_user = make_role_guard([UserRole.ADMIN, UserRole.LIBRARIAN], "librarian or admin")
+require_member_user = make_role_guard([UserRole.ADMIN, UserRole.LIBRARIAN, UserRole.MEMBER], "member or higher")
 
 # Permission Checking Functions
 def check_permission(user: UserResponse, permission: str) -> bool:
     """Check if user has specific permission."""
-    if not hasattr(user, 'has_permission'):
-        # Fallback permission checking
-        role_permissions = {
-            UserRole.ADMIN: ['admin', 'manage_books', 'manage_authors', 'manage_users', 'admin_panel'],
-            UserRole.LIBRARIAN: ['librarian', 'manage_books', 'manage_authors', 'admin_panel'],
-            UserRole.MEMBER: ['create_review', 'vote_reviews', 'borrow_books'],
-            UserRole.GUEST: []
-        }
-        user_role = getattr(user, 'role', UserRole.GUEST)
-        return permission in role_permissions.get(user_role, [])
-    
-    return user.has_permission(permission)
+    # role is the plain string value of a UserRole, which hashes like the enum member
+    return permission in _ROLE_PERMISSIONS.get(user.role, _NO_PERMISSIONS)
 
 def require_permission(permission: str):
     """Decorator to require specific permission."""
@@ -142,7 +136,7 @@ def require_permission(permission: str):
                 )
             
             if not check_permission(current_user, permission):
-                raise InsufficientPermissionsError(permission, getattr(current_user, 'role', 'unknown'))
+                raise InsufficientPermissionsError(permission, current_user.role)
             
             return await func(*args, **kwargs)
         return wrapper
@@ -161,6 +155,26 @@ async def require_resource_owner_or_admin(
         )
     return current_user
 
+def forbid_self_action(action: str):
+    """
+    Create an admin dependency that rejects ``action`` on the caller's own
+    account before the endpoint runs, so those requests never reach the DB.
+    """
+    async def check_not_self(
+        user_id: int,
+        current_user: UserResponse = Depends(require_admin_user)
+    ) -> UserResponse:
+        if user_id == current_user.id:
+            detail = f"Cannot {action} your own account"
+            log_access_attempt(current_user, "users", f"{action}_user", False, detail)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=detail
+            )
+        return current_user
+    
+    return check_not_self
+
 def create_ownership_dependency(resource_id_param: str = "resource_id"):
     """Create a dependency that checks resource ownership."""
     async def check_ownership(
@@ -180,35 +194,25 @@ class RBACDependencies:
     @staticmethod
     def require_roles(allowed_roles: List[UserRole]):
         """Create dependency that requires one of the specified roles."""
-        async def check_roles(
-            current_user: UserResponse = Depends(require_verified_user)
-        ) -> UserResponse:
-            user_role = getattr(current_user, 'role', UserRole.GUEST)
-            if user_role not in allowed_roles:
-                allowed_roles_str = ", ".join([role.value for role in allowed_roles])
-                raise InsufficientPermissionsError(
-                    f"one of: {allowed_roles_str}", 
-                    user_role.value if hasattr(user_role, 'value') else str(user_role)
-                )
-            return current_user
-        
-        return check_roles
+        return make_role_guard(allowed_roles)
     
     @staticmethod
     def require_permissions(required_permissions: List[str], require_all: bool = True):
         """Create dependency that requires specific permissions."""
+        required = frozenset(required_permissions)
+        
         async def check_permissions(
-            current_user: UserResponse = Depends(require_verified_user)
+            current_user: UserResponse = Depends(get_current_user)
         ) -> UserResponse:
-            user_permissions = getattr(current_user, 'permissions', [])
+            _ensure_active(current_user)
+            _ensure_verified(current_user)
+            user_permissions = current_user.permissions or _NO_PERMISSIONS
             
             if require_all:
-                missing_permissions = [p for p in required_permissions if p not in user_permissions]
-                if missing_permissions:
+                if not required.issubset(user_permissions):
                     raise InsufficientPermissionsError(f"all of: {', '.join(required_permissions)}")
             else:
-                has_any_permission = any(p in user_permissions for p in required_permissions)
-                if not has_any_permission:
+                if required.isdisjoint(user_permissions):
                     raise InsufficientPermissionsError(f"any of: {', '.join(required_permissions)}")
             
             return current_user
@@ -241,16 +245,76 @@ def log_access_attempt(
     details: str = None
 ):
     """Log access attempts for audit purposes."""
-    status_str = "SUCCESS" if success else "DENIED"
-    log_message = f"ACCESS {status_str}: User {user.email} ({user.role}) attempted {action} on {resource}"
+    level = logging.INFO if success else logging.WARNING
+    if not logger.isEnabledFor(level):
+        return
+    
+    logger.log(
+        level,
+        "ACCESS %s: User %s (%s) attempted %s on %s%s",
+        "SUCCESS" if success else "DENIED",
+        user.email,
+        user.role,
+        action,
+        resource,
+        f" - {details}" if details else ""
+    )
+
+def audited(resource: str, action: str, error_detail: Optional[str] = None):
+    """
+    Decorator that records access attempts for an endpoint.
     
-    if details:
-        log_message += f" - {details}"
+    Success is logged once the endpoint returns, HTTPExceptions are logged as
+    denied and re-raised, and any other error is logged and turned into a 500
+    with ``error_detail``. The endpoint must take ``current_user``; a
+    ``user_id`` path parameter is included in the audit details.
+    """
+    failure_detail = error_detail or f"Failed to {action.replace('_', ' ')}"
+    
+    def details(kwargs: dict) -> Optional[str]:
+        user_id = kwargs.get("user_id")
+        return f"User {user_id}" if user_id is not None else None
+    
+    def internal_error(current_user: UserResponse, error: Exception) -> HTTPException:
+        log_access_attempt(current_user, resource, action, False, str(error))
+        logger.exception("Error during %s on %s", action, resource)
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=failure_detail
+        )
     
-    if success:
-        logger.info(log_message)
-    else:
-        logger.warning(log_message)
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                current_user = kwargs["current_user"]
+                try:
+                    result = await func(*args, **kwargs)
+                except HTTPException as e:
+                    log_access_attempt(current_user, resource, action, False, str(e.detail))
+                    raise
+                except Exception as e:
+                    raise internal_error(current_user, e) from e
+                log_access_attempt(current_user, resource, action, True, details(kwargs))
+                return result
+            return async_wrapper
+        
+        # Sync endpoints stay sync so FastAPI keeps running them in its threadpool
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            current_user = kwargs["current_user"]
+            try:
+                result = func(*args, **kwargs)
+            except HTTPException as e:
+                log_access_attempt(current_user, resource, action, False, str(e.detail))
+                raise
+            except Exception as e:
+                raise internal_error(current_user, e) from e
+            log_access_attempt(current_user, resource, action, True, details(kwargs))
+            return result
+        return wrapper
+    
+    return decorator
 
 # Permission Middleware
 class PermissionMiddleware:
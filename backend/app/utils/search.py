@@ -0,0 +1,53 @@
+"""
+Helpers for MySQL FULLTEXT search.
+"""
+import re
+from typing import Optional
+
+# Characters with special meaning in InnoDB boolean-mode queries
+_BOOLEAN_OPERATORS_RE = re.compile(r'[+\-<>()~*"@]+')
+
+# InnoDB defaults: innodb_ft_min_token_size and INNODB_FT_DEFAULT_STOPWORD.
+# Words like these are never indexed, so requiring them would match nothing.
+FULLTEXT_MIN_TOKEN_SIZE = 3
+FULLTEXT_STOPWORDS = frozenset({
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en",
+    "for", "from", "how", "i", "in", "is", "it", "la", "of", "on", "or",
+    "that", "the", "this", "to", "was", "what", "when", "where", "who",
+    "will", "with", "und", "www",
+})
+
+
+def _is_indexed(word: str) -> bool:
+    return len(word) >= FULLTEXT_MIN_TOKEN_SIZE and word.lower() not in FULLTEXT_STOPWORDS
+
+
+def boolean_prefix_query(term: str, strict: bool = False) -> Optional[str]:
+    """
+    Turn free text into a boolean-mode query requiring every word as a prefix.
+
+    ``"tolk lord"`` becomes ``"+tolk* +lord*"`` so results behave like the old
+    substring search for the common case of typing the start of words.
+    Short words and stopwords are left out since the index never holds them;
+    with ``strict`` any such word makes the whole term unsearchable instead.
+    Returns ``None`` when nothing searchable is left, so callers fall back to
+    an escaped LIKE.
+    """
+    words = _BOOLEAN_OPERATORS_RE.sub(" ", term).split()
+    indexed = [word for word in words if _is_indexed(word)]
+    if not indexed or (strict and len(indexed) != len(words)):
+        return None
+    return " ".join(f"+{word}*" for word in indexed)
+
+
+# Escape character for LIKE patterns; avoids backslash quoting differences in MySQL
+LIKE_ESCAPE = "!"
+
+
+def like_escape(term: str) -> str:
+    """Escape LIKE wildcards in user input so ``%`` and ``_`` match literally."""
+    return (
+        term.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace("%", f"{LIKE_ESCAPE}%")
+        .replace("_", f"{LIKE_ESCAPE}_")
+    )
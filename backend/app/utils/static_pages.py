@@ -0,0 +1,69 @@
+"""
+Serving prebuilt HTML pages with conditional requests and a precompressed gzip variant.
+"""
+import gzip
+import hashlib
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+
+
+def gzip_page(html: str) -> bytes:
+    """Compress a page once at import so GZipMiddleware does not recompress it per request."""
+    return gzip.compress(html.encode("utf-8"), 9)
+
+
+def html_etag(html: str) -> str:
+    """Strong ETag for the identity body of ``html``."""
+    return '"' + hashlib.sha1(html.encode("utf-8")).hexdigest() + '"'
+
+
+def _gzip_etag(etag: str) -> str:
+    """Distinct validator for the gzip body, which is a different representation."""
+    return etag[:-1] + '-gz"'
+
+
+_STATIC_PAGE_CACHE_CONTROL = "public, max-age=300"
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Whether Accept-Encoding allows gzip, honouring q-values (``gzip;q=0`` refuses it)."""
+    wildcard = None
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        coding = coding.lower()
+        if coding == "gzip":
+            return quality > 0
+        if coding == "*":
+            wildcard = quality > 0
+    return bool(wildcard)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def static_html_response(request: Request, html: str, compressed: bytes, etag: str) -> Response:
+    """Return a prebuilt page, answering revalidation with 304 and using the gzip body when accepted."""
+    use_gzip = _accepts_gzip(request.headers.get("accept-encoding", ""))
+    if use_gzip:
+        etag = _gzip_etag(etag)
+    headers = {"ETag": etag, "Cache-Control": _STATIC_PAGE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        return Response(
+            content=compressed,
+            media_type="text/html",
+            headers={**headers, "Content-Encoding": "gzip"}
+        )
+    return HTMLResponse(content=html, headers=headers)
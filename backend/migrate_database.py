@@ -9,6 +9,13 @@ import logging
 
 logger = logging.getLogger("BookLibraryAPI")
 
+def split_author_name(author_name):
+    """Split a legacy author string (simple approach - first word is first name, rest is last name)"""
+    name_parts = author_name.strip().split()
+    if len(name_parts) >= 2:
+        return name_parts[0], " ".join(name_parts[1:])
+    return author_name.strip(), "Unknown"
+
 def migrate_database():
     """Run database migrations"""
     
@@ -26,7 +33,7 @@ def migrate_database():
                     id INT PRIMARY KEY AUTO_INCREMENT,
                     first_name VARCHAR(100) NOT NULL,
                     last_name VARCHAR(100) NOT NULL,
-                    full_name VARCHAR(200) NOT NULL,
+                    full_name VARCHAR(200) GENERATED ALWAYS AS (CONCAT(first_name, ' ', last_name)) STORED NOT NULL,
                     bio TEXT,
                     birth_year INT,
                     death_year INT,
@@ -34,7 +41,7 @@ def migrate_database():
                     website VARCHAR(255),
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                     updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                    INDEX idx_full_name (full_name)
+                    UNIQUE INDEX ix_authors_full_name (full_name)
                 );
             """))
             
@@ -106,23 +113,15 @@ def migrate_database():
             
             for (author_name,) in existing_authors:
                 if author_name and author_name.strip():
-                    # Split author name (simple approach - first word is first name, rest is last name)
-                    name_parts = author_name.strip().split()
-                    if len(name_parts) >= 2:
-                        first_name = name_parts[0]
-                        last_name = " ".join(name_parts[1:])
-                    else:
-                        first_name = author_name.strip()
-                        last_name = "Unknown"
+                    first_name, last_name = split_author_name(author_name)
                     
-                    # Insert author if not exists
+                    # Insert author if not exists; full_name is generated and unique
                     connection.execute(text("""
-                        INSERT IGNORE INTO authors (first_name, last_name, full_name)
-                        VALUES (:first_name, :last_name, :full_name);
+                        INSERT IGNORE INTO authors (first_name, last_name)
+                        VALUES (:first_name, :last_name);
                     """), {
                         "first_name": first_name,
-                        "last_name": last_name,
-                        "full_name": author_name.strip()
+                        "last_name": last_name
                     })
             
             # 6. Create relationships between books and authors
@@ -134,10 +133,11 @@ def migrate_database():
             
             for book_id, author_name in books:
                 if author_name and author_name.strip():
-                    # Find the author ID
+                    # Find the author ID by the same generated name the insert produced
+                    first_name, last_name = split_author_name(author_name)
                     author_result = connection.execute(text("""
                         SELECT id FROM authors WHERE full_name = :full_name LIMIT 1;
-                    """), {"full_name": author_name.strip()})
+                    """), {"full_name": f"{first_name} {last_name}"})
                     
                     author_row = author_result.fetchone()
                     if author_row: